@@ -0,0 +1,191 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import synthetic
+
+def measure(name: str, func, repeat: int, ops: int = 1) -> dict:
+    """
+    Times the supplied function and returns its machine readable result
+    """
+
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    return {
+        'name': name,
+        'repeat': repeat,
+        'ops': ops,
+        'min': best,
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'ops_per_sec': ops / best if best else None
+    }
+
+def run(filepath: str, cachepath: str, points: int, repeat: int, seed: int, workers: int = None) -> list:
+    """
+    Runs every benchmark against the supplied map file
+    """
+
+    results = []
+    results.append(measure('read', lambda: nfmap.MapFile.read(filepath), repeat))
+    results.append(measure('read_lazy', lambda: nfmap.MapFile.read(filepath, lazy=True).close(), repeat))
+    results.append(measure('iter_grids', lambda: sum(1 for i in nfmap.MapFile.iter_grids(filepath)), repeat))
+
+    # Reported against read so the parallel path's gain is visible at a glance
+    parallel = measure('read_parallel', lambda: nfmap.MapFile.read_parallel(filepath, workers), repeat)
+    parallel['workers'] = workers or os.cpu_count()
+    parallel['speedup'] = results[0]['min'] / parallel['min']
+    results.append(parallel)
+    results.append(measure('open_mmap', lambda: nfmap.MapFile.open_mmap(filepath).close(), repeat))
+
+    map_file = nfmap.MapFile.read(filepath)
+    map_file.write_cache(cachepath)
+    results.append(measure('read_cache', lambda: nfmap.MapFile.read_cache(cachepath).close(), repeat))
+
+    # Sample points across the loaded grids so most lookups hit terrain
+    rnd = random.Random(seed)
+    size = nfmap.constants.grid_size
+    origin = nfmap.constants.world_grid_origin * size
+    grid_coords = map_file.get_grid_coords()
+    xs = []
+    ys = []
+    for i in range(points):
+        x, y = rnd.choice(grid_coords)
+        xs.append(x * size - origin + rnd.random() * size)
+        ys.append(y * size - origin + rnd.random() * size)
+
+    vectors = [core.Vec2(x, y) for x, y in zip(xs, ys)]
+
+    def get_grids():
+        for vector in vectors:
+            map_file.get_grid(vector)
+
+    def get_heights():
+        for vector in vectors:
+            map_file.get_terrain_height(vector)
+
+    results.append(measure('get_grid', get_grids, repeat, points))
+    results.append(measure('get_terrain_height', get_heights, repeat, points))
+    results.append(measure('get_terrain_heights', lambda: map_file.get_terrain_heights(xs, ys), repeat, points))
+
+    lazy_file = nfmap.MapFile.read(filepath, lazy=True)
+
+    def get_lazy_heights():
+        for vector in vectors:
+            lazy_file.get_terrain_height(vector)
+
+    results.append(measure('get_terrain_height_lazy', get_lazy_heights, repeat, points))
+    lazy_file.close()
+
+    return results
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Returns the names of the benchmarks slower than the baseline by more
+    than the tolerance
+    """
+
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        other = previous.get(result['name'], None)
+        if other is not None and result['min'] > other['min'] * (1.0 + tolerance):
+            regressions.append(result['name'])
+
+    return regressions
+
+def main():
+    """
+    Main entry point for the application
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmarks the map parse and query paths')
+    parser.add_argument('--map', help='Existing map file to benchmark. Generated when omitted')
+    parser.add_argument('--grids', type=int, default=4, help='Generated grid count')
+    parser.add_argument('--cells', type=int, default=256, help='Generated cells per grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--points', type=int, default=10000, help='Query points per lookup benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, help='Worker processes for read_parallel. Defaults to the cpu count')
+    parser.add_argument('--output', help='Writes the results as json to the supplied path')
+    parser.add_argument('--baseline', help='Previous results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = args.map
+        if filepath is None:
+            filepath = os.path.join(directory, 'synthetic.nfmap')
+            synthetic.write_map(filepath, args.grids, args.cells, args.seed)
+
+        results = run(filepath, os.path.join(directory, 'benchmark.nfcache'), args.points, args.repeat, args.seed,
+                      args.workers)
+
+    report = {
+        'map': args.map or 'synthetic',
+        'grids': args.grids,
+        'cells': args.cells,
+        'points': args.points,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+        if regressions:
+            print('Regressions: %s' % ', '.join(regressions), file=sys.stderr)
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -25,81 +25,20 @@ SOFTWARE.
 
 import sys
 
-from panda3d import core
-
-from direct.showbase.ShowBase import ShowBase
-
-from panda3d_nexus import map as nfmap
-
-# Set engine configuration
-core.load_prc_file_data("example", """
-window-title Heightmap Sample
-sync-video #f
-show-frame-rate-meter #t
-""")
-
-class SampleBase(ShowBase):
-    """
-    Showbase example for Panda3d
-    """
-
-    def setup(self):
-        """
-        Performs setup operations on the showbase
-        """
-
-        print('Loading map...')
-        self.map_file = nfmap.MapFile.read('example/Arcterra.nfmap')
-
-        for grid_key in self.map_file.grids:
-            grid = self.map_file.grids[grid_key]
-            print('Processing grid: %s' % grid_key)
-
-            data = []
-            px = 0
-            print('Reading cells')
-
-            for cell_key in grid.cells:
-                cell = grid.cells[cell_key]
-
-                for x in range(17):
-                    data.append([])
-                    for z in range(17):
-                        height = cell.get_terrain_height(core.Vec3(x, 0, z))
-                        height = abs(height)
-                        height = height / 255
-                        data[px].append(height)
-                    px += 1
-
-            print('Building image')
-            w = len(data)
-            h = 17
-            print('Size: %s, %s' % (w, h))
-            image = core.PNMImage(w, h)
-            image.fill(0, 0, 0)
-
-            for x in range(w):
-                for y in range(h):
-                    v = data[x][y]
-
-                    image.set_red(x, y, v)
-                    image.set_green(x, y, v)
-                    image.set_blue(x, y, v)
-
-            filepath = core.Filename('output/%s.png' % grid_key)
-            image.write(filepath)
-            print('Saving: %s ' % filepath.c_str())
-
-        print('Map loaded')
+from panda3d_nexus import export
 
 def main():
     """
     Main entry point for the application
     """
 
-    base = SampleBase()
-    base.setup()
-    base.run()
+    print('Exporting map...')
+    manifest = export.export_map('example/Arcterra.nfmap', 'output', 'png')
+    print('Height range: %s, %s' % tuple(manifest['range']))
+    for entry in manifest['grids']:
+        print('Saved: output/%s' % entry['file'])
+
+    return 0
 
 if __name__ == '__main__':
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
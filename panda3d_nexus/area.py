@@ -0,0 +1,164 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+import math
+
+from . import grid, constants
+
+class AreaIndex(object):
+    """
+    Spatial index of the map's world area ids. Maps each area id to the
+    cells containing it and their world bounding box, and each cell to its
+    area ids so range queries only visit the cells they overlap. Cells
+    are addressed by their global cell coordinate, grid * 16 + cell
+    """
+
+    notify = directNotify.newCategory('area')
+
+    def __init__(self):
+        self._areas_by_cell = {}
+        self._cells_by_area = {}
+        self._bounds = {}
+
+    @property
+    def area_ids(self) -> list:
+        return list(self._cells_by_area)
+
+    def add_grid(self, file_grid: grid.MapFileGrid) -> None:
+        """
+        Indexes the area ids of the grid's cells
+        """
+
+        cells = constants.grid_cell_count
+        for slot in range(grid.MapFileGrid.CELL_SLOTS):
+            cell = file_grid.get_cell_slot(slot)
+            if cell is None:
+                continue
+
+            area_ids = tuple(set(area_id for area_id in cell.get_world_area_ids() if area_id))
+            if not area_ids:
+                continue
+
+            cell_x = file_grid.x * cells + slot % cells
+            cell_y = file_grid.y * cells + slot // cells
+            self._areas_by_cell[cell_x << 16 | cell_y] = area_ids
+
+            for area_id in area_ids:
+                self._cells_by_area.setdefault(area_id, []).append((cell_x, cell_y))
+                self.__extend_bounds(area_id, cell_x, cell_y)
+
+        if self.notify.getDebug():
+            self.notify.debug('Indexed %s areas' % len(self._cells_by_area))
+
+    def __extend_bounds(self, area_id: int, cell_x: int, cell_y: int) -> None:
+        """
+        Grows the area's bounding box to contain the cell
+        """
+
+        bounds = self._bounds.get(area_id, None)
+        if bounds is None:
+            self._bounds[area_id] = (cell_x, cell_y, cell_x, cell_y)
+            return
+
+        self._bounds[area_id] = (
+            min(bounds[0], cell_x), min(bounds[1], cell_y),
+            max(bounds[2], cell_x), max(bounds[3], cell_y))
+
+    def get_cell_coords(self, area_id: int) -> list:
+        """
+        Returns the global (x, y) cell coordinates containing the area
+        """
+
+        return list(self._cells_by_area.get(area_id, ()))
+
+    def get_area_bounds(self, area_id: int) -> tuple:
+        """
+        Returns the area's world space (min_x, min_y, max_x, max_y)
+        bounding box, or None if the area is unknown
+        """
+
+        bounds = self._bounds.get(area_id, None)
+        if bounds is None:
+            return None
+
+        origin = constants.world_grid_origin * constants.grid_size
+        size = constants.grid_cell_size
+        return (
+            bounds[0] * size - origin, bounds[1] * size - origin,
+            (bounds[2] + 1) * size - origin, (bounds[3] + 1) * size - origin)
+
+    def get_area_ids(self, vector: core.Vec2) -> tuple:
+        """
+        Returns the area ids of the cell containing the world position
+        """
+
+        cell_x, cell_y = self.__get_cell_coord(vector.get_x(), vector.get_y())
+        return self._areas_by_cell.get(cell_x << 16 | cell_y, ())
+
+    def get_area_ids_in_radius(self, vector: core.Vec2, radius: float) -> set:
+        """
+        Returns the area ids of every cell within radius of the world position
+        """
+
+        x = vector.get_x()
+        y = vector.get_y()
+        min_x, min_y = self.__get_cell_coord(x - radius, y - radius)
+        max_x, max_y = self.__get_cell_coord(x + radius, y + radius)
+
+        origin = constants.world_grid_origin * constants.grid_size
+        size = constants.grid_cell_size
+        radius_squared = radius * radius
+
+        area_ids = set()
+        for cell_x in range(min_x, max_x + 1):
+            # Distance from the point to the nearest point of the cell
+            cell_left = cell_x * size - origin
+            distance_x = max(cell_left - x, 0, x - cell_left - size)
+
+            for cell_y in range(min_y, max_y + 1):
+                found = self._areas_by_cell.get(cell_x << 16 | cell_y, None)
+                if not found:
+                    continue
+
+                cell_bottom = cell_y * size - origin
+                distance_y = max(cell_bottom - y, 0, y - cell_bottom - size)
+                if distance_x * distance_x + distance_y * distance_y <= radius_squared:
+                    area_ids.update(found)
+
+        return area_ids
+
+    def __get_cell_coord(self, x: float, y: float) -> (int, int):
+        """
+        Returns the global cell coordinate of the world position
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        return (
+            int(math.floor((x + origin) / constants.grid_cell_size)),
+            int(math.floor((y + origin) / constants.grid_cell_size)))
@@ -0,0 +1,270 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+from collections import OrderedDict
+import sys
+
+from . import grid, heightfield, constants
+
+class TerrainCollider(object):
+    """
+    Builds and caches per grid terrain colliders. Cells are triangulated
+    with a quadtree that collapses blocks whose vertices all lie within
+    tolerance of the block's two triangles, so flat and evenly sloped
+    ground costs two polygons instead of 512. Triangles are split the same
+    way MapFileCell.get_height interpolates them. Positions are world
+    (x, y, height)
+    """
+
+    notify = directNotify.newCategory('collision')
+
+    TOLERANCE = 0.05
+    CACHE_SIZE = 16
+
+    def __init__(self, map_file, tolerance: float = TOLERANCE, cache_size: int = CACHE_SIZE):
+        self._map_file = map_file
+        self._tolerance = tolerance
+        self._cache_size = cache_size
+        self._generation = map_file.generation
+        self._nodes = OrderedDict()
+
+    @property
+    def tolerance(self) -> float:
+        return self._tolerance
+
+    def get_node(self, file_grid: grid.MapFileGrid) -> core.PandaNode:
+        """
+        Returns the grid's collision node, building it on first request.
+        At most cache_size nodes are kept (0 for unbounded)
+        """
+
+        if self._generation != self._map_file.generation:
+            self._nodes.clear()
+            self._generation = self._map_file.generation
+
+        index = file_grid.x << 16 | file_grid.y
+        node = self._nodes.get(index, None)
+        if node is not None:
+            self._nodes.move_to_end(index)
+            return node
+
+        node = self.build_node(file_grid, self._tolerance)
+        self._nodes[index] = node
+        if self._cache_size and len(self._nodes) > self._cache_size:
+            self._nodes.popitem(last=False)
+
+        return node
+
+    def get_node_at(self, vector: core.Vec2) -> core.PandaNode:
+        """
+        Returns the collision node of the grid at the supplied position
+        """
+
+        file_grid = self._map_file.get_grid(vector)
+        if file_grid is None:
+            return None
+
+        return self.get_node(file_grid)
+
+    def clear(self) -> None:
+        """
+        Drops every cached collision node
+        """
+
+        self._nodes.clear()
+
+    @classmethod
+    def build_node(cls, file_grid: grid.MapFileGrid, tolerance: float = TOLERANCE, name: str = None) -> core.PandaNode:
+        """
+        Builds the grid's collider as a node holding one CollisionNode of
+        polygons per present cell, letting the traverser cull by cell bounds
+        """
+
+        if name is None:
+            name = 'grid-collision-%s-%s' % (file_grid.x, file_grid.y)
+
+        field = heightfield.Heightfield.from_grid(file_grid)
+        root = core.PandaNode(name)
+        polygons = 0
+        for slot in range(grid.MapFileGrid.CELL_SLOTS):
+            cell = file_grid.get_cell_slot(slot)
+            if cell is None or not len(cell.heights):
+                continue
+
+            triangles = cls.get_cell_triangles(field, slot % constants.grid_cell_count,
+                slot // constants.grid_cell_count, tolerance)
+
+            node = core.CollisionNode('%s-cell-%s-%s' % (name, cell.x, cell.y))
+            for offset in range(0, len(triangles), 9):
+                node.add_solid(core.CollisionPolygon(
+                    core.Point3(*triangles[offset:offset + 3]),
+                    core.Point3(*triangles[offset + 3:offset + 6]),
+                    core.Point3(*triangles[offset + 6:offset + 9])))
+
+            root.add_child(node)
+            polygons += len(triangles) // 9
+
+        if cls.notify.getDebug():
+            cls.notify.debug('Built %s collision polygons for grid (%s, %s)' % (polygons, file_grid.x, file_grid.y))
+
+        return root
+
+    @classmethod
+    def get_cell_triangles(cls, field: heightfield.Heightfield, cell_x: int, cell_y: int,
+                           tolerance: float = TOLERANCE) -> array:
+        """
+        Returns the simplified triangles of a cell of a single grid
+        heightfield as a flat float32 array of counter-clockwise, upward
+        facing (x, y, z) triples
+        """
+
+        quads = constants.cell_vertex_count - 1
+        triangles = array('f')
+        blocks = [(cell_x * quads, cell_y * quads, quads)]
+        while blocks:
+            x, y, size = blocks.pop()
+            if size > 1 and not cls.__is_planar(field, x, y, size, tolerance):
+                half = size // 2
+                blocks.extend(((x, y, half), (x + half, y, half), (x, y + half, half), (x + half, y + half, half)))
+                continue
+
+            cls.__add_block(triangles, field, x, y, size)
+
+        return triangles
+
+    @classmethod
+    def __is_planar(cls, field: heightfield.Heightfield, x: int, y: int, size: int, tolerance: float) -> bool:
+        """
+        Returns true if every vertex of the block lies within tolerance of
+        the block's two triangles
+        """
+
+        data = field.data
+        width = field.width
+        h00 = data[y * width + x]
+        h10 = data[y * width + x + size]
+        h01 = data[(y + size) * width + x]
+        h11 = data[(y + size) * width + x + size]
+
+        scale = 1.0 / size
+        for j in range(size + 1):
+            row = (y + j) * width + x
+            fy = j * scale
+            for i in range(size + 1):
+                fx = i * scale
+                if fx + fy < 1:
+                    expected = h00 + (h10 - h00) * fx + (h01 - h00) * fy
+                else:
+                    expected = h11 + (h10 - h11) * (1.0 - fy) + (h01 - h11) * (1.0 - fx)
+
+                if abs(data[row + i] - expected) > tolerance:
+                    return False
+
+        return True
+
+    @classmethod
+    def __add_block(cls, triangles: array, field: heightfield.Heightfield, x: int, y: int, size: int) -> None:
+        """
+        Appends the block's two triangles, split along the diagonal from
+        (x + size, y) to (x, y + size)
+        """
+
+        data = field.data
+        width = field.width
+        spacing = field.spacing
+        x0 = field.origin[0] + x * spacing
+        y0 = field.origin[1] + y * spacing
+        x1 = x0 + size * spacing
+        y1 = y0 + size * spacing
+        h00 = data[y * width + x]
+        h10 = data[y * width + x + size]
+        h01 = data[(y + size) * width + x]
+        h11 = data[(y + size) * width + x + size]
+
+        triangles.extend((
+            x0, y0, h00, x1, y0, h10, x0, y1, h01,
+            x1, y1, h11, x0, y1, h01, x1, y0, h10))
+
+    @classmethod
+    def get_heightfield_buffer(cls, file_grid: grid.MapFileGrid) -> (array, float, float):
+        """
+        Returns the grid's heights as a row-major float32 buffer of
+        257x257 vertices normalized to 0..1, with the height offset and
+        scale restoring them, for Bullet heightfield shapes. Missing cells
+        sit at the grid's lowest height
+        """
+
+        field = heightfield.Heightfield.from_grid(file_grid)
+        nodata = field.nodata
+        values = [value for value in field.data if value != nodata]
+        low = min(values) if values else 0.0
+        high = max(values) if values else 0.0
+        scale = high - low
+        factor = 1.0 / scale if scale else 0.0
+
+        buffer = array('f', [(value - low) * factor if value != nodata else 0.0 for value in field.data])
+        return (buffer, low, scale)
+
+    @classmethod
+    def build_bullet_shape(cls, file_grid: grid.MapFileGrid) -> tuple:
+        """
+        Builds a BulletHeightfieldShape for the grid, returning the shape
+        and the transform to give its node. Requires the panda3d.bullet module
+        """
+
+        from panda3d import bullet
+
+        buffer, low, scale = cls.get_heightfield_buffer(file_grid)
+        max_height = scale or 1.0
+        size = constants.grid_size // constants.cell_vertex_size + 1
+        if sys.byteorder != 'little':
+            buffer.byteswap()
+
+        texture = core.Texture('grid-heights-%s-%s' % (file_grid.x, file_grid.y))
+        texture.setup_2d_texture(size, size, core.Texture.T_float, core.Texture.F_r32)
+        texture.set_ram_image(buffer.tobytes())
+
+        # Bullet's default quad split matches MapFileCell.get_height
+        shape = bullet.BulletHeightfieldShape(texture, max_height, bullet.Z_up)
+        shape.set_use_diamond_subdivision(False)
+
+        # Bullet centres the shape on its vertex lattice and height range
+        # with one unit between vertices
+        origin = constants.world_grid_origin * constants.grid_size
+        half = constants.grid_size / 2.0
+        transform = core.TransformState.make_pos_hpr_scale(
+            core.Point3(
+                file_grid.x * constants.grid_size - origin + half,
+                file_grid.y * constants.grid_size - origin + half,
+                low + max_height / 2.0),
+            core.Vec3(0, 0, 0),
+            core.Vec3(constants.cell_vertex_size, constants.cell_vertex_size, 1))
+
+        return (shape, transform)
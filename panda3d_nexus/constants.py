@@ -27,4 +27,6 @@ world_grid_count = 128
 world_grid_origin = int(world_grid_count / 2)
 grid_size = 512
 grid_cell_size=  32
-grid_cell_count = int(grid_size / grid_cell_size)
\ No newline at end of file
+grid_cell_count = int(grid_size / grid_cell_size)
+cell_vertex_count = 17
+cell_vertex_size = int(grid_cell_size / (cell_vertex_count - 1))
\ No newline at end of file
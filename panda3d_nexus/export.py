@@ -0,0 +1,260 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+from concurrent import futures
+import argparse
+import json
+import math
+import mmap
+import os
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import map as nfmap, grid, heightfield, constants
+
+notify = directNotify.newCategory('export')
+
+FORMATS = ('png', 'r16', 'f32')
+SAMPLE_MAX = 65535
+
+def get_grid_range(file_grid: grid.MapFileGrid) -> (float, float):
+    """
+    Returns the minimum and maximum height of the grid's cells
+    """
+
+    flags, heights = file_grid.get_tiles()[:2]
+    length = grid.MapFileCell.HEIGHTMAP_LENGTH
+    present = grid.MapFileGrid.TILE_PRESENT | grid.MapFileCell.HEIGHT_FLAG
+
+    low = math.inf
+    high = -math.inf
+    for slot, slot_flags in enumerate(flags):
+        if slot_flags & present != present:
+            continue
+
+        tile = heights[slot * length:(slot + 1) * length]
+        low = min(low, min(tile))
+        high = max(high, max(tile))
+
+    return (low, high)
+
+def get_samples(file_grid: grid.MapFileGrid, height_range: tuple) -> array:
+    """
+    Returns the grid's vertices as row-major uint16 samples normalized to
+    the supplied (min, max) height range. Missing cells are 0
+    """
+
+    field = heightfield.Heightfield.from_grid(file_grid)
+    low, high = height_range
+    scale = SAMPLE_MAX / (high - low) if high > low else 0.0
+    nodata = field.nodata
+
+    if numpy is None:
+        return array('H', [0 if h == nodata else min(SAMPLE_MAX, max(0, int((h - low) * scale + 0.5)))
+            for h in field.data])
+
+    heights = numpy.frombuffer(field.data, dtype=numpy.float32)
+    values = numpy.clip(numpy.floor((heights.astype(numpy.float64) - low) * scale + 0.5), 0, SAMPLE_MAX)
+    values[heights == nodata] = 0
+
+    samples = array('H')
+    samples.frombytes(values.astype(numpy.uint16).tobytes())
+    return samples
+
+def write_grid(file_grid: grid.MapFileGrid, filepath: str, format: str = 'png', height_range: tuple = None) -> None:
+    """
+    Writes the grid's heights as a 16-bit grayscale png, raw little endian
+    uint16 (r16) or raw little endian float32 (f32) tile. Normalized
+    formats default to the grid's own height range
+    """
+
+    if format not in FORMATS:
+        raise ValueError('Unsupported export format: %s' % format)
+
+    if format == 'f32':
+        data = heightfield.Heightfield.from_grid(file_grid).data
+        if sys.byteorder != 'little':
+            data.byteswap()
+
+        with open(filepath, 'wb') as f:
+            f.write(data.tobytes())
+
+        return
+
+    samples = get_samples(file_grid, height_range or get_grid_range(file_grid))
+    if format == 'r16':
+        if sys.byteorder != 'little':
+            samples.byteswap()
+
+        with open(filepath, 'wb') as f:
+            f.write(samples.tobytes())
+
+        return
+
+    # Hand PNMImage a binary 16-bit PGM, which stores big endian samples
+    size = int(math.sqrt(len(samples)))
+    if sys.byteorder == 'little':
+        samples.byteswap()
+
+    pgm = b'P5\n%d %d\n%d\n' % (size, size, SAMPLE_MAX) + samples.tobytes()
+    image = core.PNMImage()
+    if not image.read(core.StringStream(pgm), 'grid.pgm'):
+        raise IOError('Failed to decode heightmap image for grid (%s, %s)' % (file_grid.x, file_grid.y))
+
+    if not image.write(core.Filename.from_os_specific(filepath)):
+        raise IOError('Failed to write heightmap image: %s' % filepath)
+
+def get_filename(x: int, y: int, format: str) -> str:
+    """
+    Returns the exported file name of the supplied grid
+    """
+
+    return '%s_%s.%s' % (x, y, format)
+
+def _read_grids(filepath: str, offsets: list) -> list:
+    """
+    Parses the heights of the grids at the supplied byte offsets of the
+    map file, as indexed by MapFile.scan_grids
+    """
+
+    file_grids = []
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        for offset in offsets:
+            x, y, tiles = grid.MapFileGrid.parse_tiles(buffer, offset, grid.MapFileCell.HEIGHT_FLAG)
+            file_grids.append(grid.MapFileGrid.from_tiles(x, y, *tiles))
+
+    return file_grids
+
+def _get_ranges(filepath: str, offsets: list) -> list:
+    """
+    Returns the height range of each supplied grid. Runs inside the
+    worker processes of export_map
+    """
+
+    return [get_grid_range(file_grid) for file_grid in _read_grids(filepath, offsets)]
+
+def _write_grids(filepath: str, offsets: list, directory: str, format: str, height_range: tuple) -> list:
+    """
+    Exports each supplied grid, returning the written file paths. Runs
+    inside the worker processes of export_map
+    """
+
+    filepaths = []
+    for file_grid in _read_grids(filepath, offsets):
+        output = os.path.join(directory, get_filename(file_grid.x, file_grid.y, format))
+        write_grid(file_grid, output, format, height_range)
+        filepaths.append(output)
+
+    return filepaths
+
+def export_map(filepath: str, directory: str, format: str = 'png', workers: int = None, height_range: tuple = None) -> dict:
+    """
+    Exports every grid of the map file into the supplied directory, fanning
+    the grids out across worker processes. Normalized formats share the
+    map's real height range unless one is supplied. A manifest.json
+    describing the export is written alongside the tiles and returned
+    """
+
+    if format not in FORMATS:
+        raise ValueError('Unsupported export format: %s' % format)
+
+    notify.info('Exporting map file: %s' % filepath)
+    os.makedirs(directory, exist_ok=True)
+
+    # Index the grids once; the workers parse them straight from their offsets
+    asset, offsets = nfmap.MapFile.scan_grids(filepath)
+    coords = list(offsets)
+
+    workers = workers or os.cpu_count() or 1
+    batch_size = max(1, int(math.ceil(len(coords) / (workers * 4.0))))
+    batches = [[offsets[coord] for coord in coords[i:i + batch_size]] for i in range(0, len(coords), batch_size)]
+
+    filepaths = []
+    with futures.ProcessPoolExecutor(workers) as executor:
+        if height_range is None and format != 'f32':
+            low = math.inf
+            high = -math.inf
+            for ranges in executor.map(_get_ranges, [filepath] * len(batches), batches):
+                for grid_low, grid_high in ranges:
+                    low = min(low, grid_low)
+                    high = max(high, grid_high)
+
+            height_range = (low, high) if low <= high else (0.0, 0.0)
+
+        count = len(batches)
+        for written in executor.map(_write_grids, [filepath] * count, batches, [directory] * count,
+                                    [format] * count, [height_range] * count):
+            filepaths.extend(written)
+
+    manifest = {
+        'asset': asset,
+        'format': format,
+        'size': constants.grid_size // constants.cell_vertex_size + 1,
+        'range': list(height_range) if height_range else None,
+        'nodata': heightfield.Heightfield.NODATA if format == 'f32' else 0,
+        'grids': [{'x': x, 'y': y, 'file': get_filename(x, y, format)} for x, y in coords]
+    }
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    notify.info('Exported %s grids to %s' % (len(filepaths), directory))
+    return manifest
+
+def main():
+    """
+    Command line entry point for exporting map files
+    """
+
+    parser = argparse.ArgumentParser(description='Exports NFMap heights as images or raw tiles')
+    parser.add_argument('map', help='Map file to export')
+    parser.add_argument('output', help='Output directory')
+    parser.add_argument('--format', choices=FORMATS, default='png')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--min', type=float, default=None, help='Height mapped to 0')
+    parser.add_argument('--max', type=float, default=None, help='Height mapped to 65535')
+    args = parser.parse_args()
+
+    if (args.min is None) != (args.max is None):
+        parser.error('--min and --max must be supplied together')
+
+    height_range = (args.min, args.max) if args.min is not None else None
+
+    manifest = export_map(args.map, args.output, args.format, args.workers, height_range)
+    print('Exported %s grids to %s' % (len(manifest['grids']), args.output))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,16 +27,53 @@ from panda3d import core
 
 from direct.directnotify.DirectNotifyGlobal import directNotify
 
+from array import array
+from collections.abc import Mapping
 from enum import Enum
+from os import SEEK_CUR
 import math
+import struct
+import sys
 
 from . import reader, constants
 
+class CellLayerView(Mapping):
+    """
+    Read-only mapping over one of a cell's flat layer arrays, keyed like
+    the dicts cells used to hold: (x, y) vertices for the heightmap and
+    0 to 3 for the world area ids
+    """
+
+    __slots__ = ('_values', '_keys')
+
+    def __init__(self, values, keys: dict):
+        self._values = values
+        self._keys = keys
+
+    def __getitem__(self, key):
+        index = self._keys.get(key, None)
+        if index is None or index >= len(self._values):
+            raise KeyError(key)
+
+        return self._values[index]
+
+    def __iter__(self):
+        return iter(self._keys if len(self._values) else ())
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return '%s(%r)' % (type(self).__name__, dict(self.items()))
+
 class MapFileCell(object):
     """
-    Represents a cell in the map grid
+    Represents a cell in the map grid. Cells use __slots__ and keep their
+    layers in typed arrays so a fully loaded map stays compact
     """
 
+    __slots__ = ('_x', '_y', '_flags', '_world_area_ids', '_heightmap', '_aura_ids', '_liquid_heightmap', '_normals')
+
     notify = directNotify.newCategory('cell')
 
     class Flags(Enum):
@@ -46,13 +83,46 @@ class MapFileCell(object):
         Aura = 4
         Liquid = 8
 
+    AREA_FLAG = Flags.Area.value
+    HEIGHT_FLAG = Flags.Height.value
+    AURA_FLAG = Flags.Aura.value
+    LIQUID_FLAG = Flags.Liquid.value
+    ALL_LAYERS = AREA_FLAG | HEIGHT_FLAG | AURA_FLAG | LIQUID_FLAG
+
+    AREA_COUNT = 4
+    AURA_COUNT = 4
+    HEIGHTMAP_LENGTH = constants.cell_vertex_count * constants.cell_vertex_count
+
+    # Layers are stored in flag bit order. The aura and liquid layouts
+    # mirror the area ids and heightmap respectively
+    LAYER_SIZES = {
+        AREA_FLAG: AREA_COUNT * 4,
+        HEIGHT_FLAG: HEIGHTMAP_LENGTH * 4,
+        AURA_FLAG: AURA_COUNT * 4,
+        LIQUID_FLAG: HEIGHTMAP_LENGTH * 4
+    }
+
+    # Keys of the heightmap and world_area_ids views into the flat layers
+    HEIGHTMAP_KEYS = {(x, y): x * constants.cell_vertex_count + y
+        for x in range(constants.cell_vertex_count) for y in range(constants.cell_vertex_count)}
+    AREA_KEYS = {index: index for index in range(AREA_COUNT)}
+
+    NEIGHBOUR_OFFSETS = [(x, y) for x in (-1, 0, 1) for y in (-1, 0, 1) if x or y]
+
+    EMPTY_WORLD_AREA_IDS = array('I', bytes(AREA_COUNT * 4))
+    EMPTY_AURA_IDS = array('I', bytes(AURA_COUNT * 4))
+    EMPTY_HEIGHTMAP = array('f')
+
     def __init__(self):
         self._x = 0
         self._y = 0 
         self._flags = 0
 
-        self._world_area_ids = {}
-        self._heightmap = {}
+        self._world_area_ids = self.EMPTY_WORLD_AREA_IDS
+        self._heightmap = self.EMPTY_HEIGHTMAP
+        self._aura_ids = self.EMPTY_AURA_IDS
+        self._liquid_heightmap = self.EMPTY_HEIGHTMAP
+        self._normals = None
 
     @property
     def x(self) -> float:
@@ -63,88 +133,413 @@ class MapFileCell(object):
         return self._y
 
     @property
-    def heightmap(self) -> dict:
+    def heights(self) -> array:
+        """
+        Flat 17x17 float32 heightmap, indexed by x * 17 + y
+        """
+
         return self._heightmap
 
     @property
-    def world_area_ids(self) -> dict:
+    def heightmap(self) -> CellLayerView:
+        """
+        Read-only view of the heightmap keyed by (x, y) vertex. Use heights
+        for the flat array
+        """
+
+        return CellLayerView(self._heightmap, self.HEIGHTMAP_KEYS)
+
+    @property
+    def normals(self) -> array:
+        """
+        Flat 17x17 float32 per-vertex (x, y, z) normals, indexed by
+        (x * 17 + y) * 3. Built from the heightmap alone on first use
+        unless build_normals was called with the cell's neighbours
+        """
+
+        if self._normals is None:
+            self.build_normals()
+
+        return self._normals
+
+    @property
+    def has_normals(self) -> bool:
+        return self._normals is not None
+
+    @property
+    def area_ids(self) -> array:
+        """
+        The cell's four uint32 world area ids, indexed 0 to 3
+        """
+
         return self._world_area_ids
 
-    def read(self, reader: reader.BinaryReader) -> None:
+    @property
+    def world_area_ids(self) -> CellLayerView:
         """
-        Reads the cells binary data
+        Read-only view of the world area ids keyed 0 to 3. Use area_ids for
+        the flat array
         """
 
-        self._x = reader.read_uint()
-        self._y = reader.read_uint()
+        world_area_ids = self._world_area_ids if self._flags & self.AREA_FLAG else ()
+        return CellLayerView(world_area_ids, self.AREA_KEYS)
+
+    @property
+    def aura_ids(self) -> array:
+        """
+        The cell's four uint32 aura ids, indexed 0 to 3
+        """
+
+        return self._aura_ids
+
+    @property
+    def liquid_heightmap(self) -> array:
+        """
+        Flat 17x17 float32 liquid surface heightmap, indexed by x * 17 + y
+        """
+
+        return self._liquid_heightmap
+
+    @property
+    def flags(self) -> int:
+        """
+        Flags of the layers loaded into the cell
+        """
+
+        return self._flags
+
+    @classmethod
+    def from_layers(cls, x: int, y: int, flags: int, heightmap, world_area_ids,
+                    aura_ids=None, liquid_heightmap=None):
+        """
+        Creates a cell from already decoded layers
+        """
 
-        self._flags = reader.read_uint()
+        cell = cls()
+        cell._x = x
+        cell._y = y
+        cell._flags = flags
 
-        for i in range(32):
-            flag = 1 << i
+        if flags & cls.AREA_FLAG:
+            cell._world_area_ids = world_area_ids
 
-            if (self._flags & flag) == 0:
+        if flags & cls.HEIGHT_FLAG:
+            cell._heightmap = heightmap
+
+        if flags & cls.AURA_FLAG and aura_ids is not None:
+            cell._aura_ids = aura_ids
+
+        if flags & cls.LIQUID_FLAG and liquid_heightmap is not None:
+            cell._liquid_heightmap = liquid_heightmap
+
+        return cell
+
+    def read(self, reader: reader.BinaryReader, zero_copy: bool = False, layers: int = ALL_LAYERS) -> None:
+        """
+        Reads the cells binary data. When zero_copy is set the layers are
+        served as views into the reader's underlying buffer. Layers missing
+        from the layers mask are seeked past without being decoded
+        """
+
+        self._x, self._y, flags = reader.read_struct('3I')
+        self._flags = flags & layers
+
+        unsupported = flags & ~self.ALL_LAYERS
+        if unsupported:
+            self.notify.error('%s is not implemented' % unsupported)
+
+        # Layers are stored in flag bit order
+        skipped = 0
+        for flag, layer_size in self.LAYER_SIZES.items():
+            if not flags & flag:
                 continue
 
-            if flag == self.Flags.Area.value:
-                for j in range(4):
-                    self._world_area_ids[j] = reader.read_uint()
-            elif flag == self.Flags.Height.value:
-                for x in range(17):
-                    for y in range(17):
-                        self._heightmap[(x, y)] = reader.read_float()
+            if not layers & flag:
+                skipped += layer_size
+                continue
+
+            if skipped:
+                reader.seek(skipped, SEEK_CUR)
+                skipped = 0
+
+            if flag == self.AREA_FLAG:
+                self._read_world_area_ids(reader, zero_copy)
+            elif flag == self.HEIGHT_FLAG:
+                self._read_heightmap(reader, zero_copy)
+            elif flag == self.AURA_FLAG:
+                self._read_aura_ids(reader, zero_copy)
             else:
-                self.notify.error('%s is not implemented' % flag)
+                self._read_liquid_heightmap(reader, zero_copy)
+
+        if skipped:
+            reader.seek(skipped, SEEK_CUR)
 
         if self.notify.getDebug():
             self.notify.debug('Loaded %s areas' % len(self._world_area_ids))
             self.notify.debug('Loaded %s heightmap points' % len(self._heightmap))
 
+    @classmethod
+    def skip(cls, reader: reader.BinaryReader) -> (int, int):
+        """
+        Seeks past the cells binary data without decoding its layers.
+        Returns the cell's coordinate
+        """
+
+        x, y, flags = reader.read_struct('3I')
+        size = 0
+        for flag, layer_size in cls.LAYER_SIZES.items():
+            if flags & flag:
+                size += layer_size
+                flags &= ~flag
+
+        if flags:
+            cls.notify.error('%s is not implemented' % flags)
+
+        reader.seek(size, SEEK_CUR)
+        return (x, y)
+
+    def _read_world_area_ids(self, reader: reader.BinaryReader, zero_copy: bool) -> None:
+        """
+        Reads the cell's world area ids
+        """
+
+        if zero_copy and reader.is_native():
+            self._world_area_ids = reader.read_view(self.AREA_COUNT * 4).cast('I')
+            return
+
+        self._world_area_ids = reader.read_uint_array(self.AREA_COUNT)
+
+    def _read_heightmap(self, reader: reader.BinaryReader, zero_copy: bool) -> None:
+        """
+        Decodes the 17x17 height block in a single bulk read
+        """
+
+        size = self.HEIGHTMAP_LENGTH * 4
+        if zero_copy and reader.is_native():
+            self._heightmap = reader.read_view(size).cast('f')
+            return
+
+        self._heightmap = reader.read_float_array(self.HEIGHTMAP_LENGTH)
+
+    def _read_aura_ids(self, reader: reader.BinaryReader, zero_copy: bool) -> None:
+        """
+        Reads the cell's aura ids
+        """
+
+        if zero_copy and reader.is_native():
+            self._aura_ids = reader.read_view(self.AURA_COUNT * 4).cast('I')
+            return
+
+        self._aura_ids = reader.read_uint_array(self.AURA_COUNT)
+
+    def _read_liquid_heightmap(self, reader: reader.BinaryReader, zero_copy: bool) -> None:
+        """
+        Decodes the 17x17 liquid surface block in a single bulk read
+        """
+
+        size = self.HEIGHTMAP_LENGTH * 4
+        if zero_copy and reader.is_native():
+            self._liquid_heightmap = reader.read_view(size).cast('f')
+            return
+
+        self._liquid_heightmap = reader.read_float_array(self.HEIGHTMAP_LENGTH)
+
+    def get_memory_size(self) -> int:
+        """
+        Returns an estimate of the cell's memory use in bytes. Layers held
+        as views into a shared buffer only count their view objects
+        """
+
+        size = sys.getsizeof(self) + sys.getsizeof(self._heightmap) + sys.getsizeof(self._world_area_ids)
+        size += sys.getsizeof(self._aura_ids) + sys.getsizeof(self._liquid_heightmap)
+        if self._normals is not None:
+            size += sys.getsizeof(self._normals)
+
+        return size
+
     def get_world_area_ids(self) -> list:
         """
         Returns the cell's areas if present
         """
 
-        contains = self._flags & self.Flags.Area.value
+        contains = self._flags & self.AREA_FLAG
         return self._world_area_ids if contains else []
 
+    def get_world_area_id(self) -> int:
+        """
+        Returns the cell's primary world area id or 0 if not present
+        """
+
+        if not self._flags & self.AREA_FLAG:
+            return 0
+
+        return self._world_area_ids[0]
+
+    def get_aura_ids(self) -> list:
+        """
+        Returns the cell's auras if present
+        """
+
+        contains = self._flags & self.AURA_FLAG
+        return self._aura_ids if contains else []
+
     def get_terrain_height(self, vector: core.Vec3) -> float:
         """
         Returns the terrain's height at the supplied vector
         """
 
+        return self.get_height(vector.get_x(), vector.get_z())
+
+    def get_height(self, x: float, z: float) -> float:
+        """
+        Returns the terrain's height at the supplied world x and z coordinate
+        """
+
         # Verify heightmap data is present
         if not len(self._heightmap):
             return 0
 
-        true_x = vector.get_x() + constants.world_grid_origin * constants.grid_size
-        true_z = vector.get_z() + constants.world_grid_origin * constants.grid_size
+        return self._interpolate(self._heightmap, x, z)
+
+    def get_liquid_height(self, x: float, z: float) -> float:
+        """
+        Returns the liquid surface height at the supplied world x and z
+        coordinate, or None if the cell has no liquid
+        """
+
+        if not len(self._liquid_heightmap):
+            return None
+
+        return self._interpolate(self._liquid_heightmap, x, z)
+
+    def _interpolate(self, heightmap, x: float, z: float) -> float:
+        """
+        Interpolates the 17x17 heightmap at the supplied world x and z
+        coordinate over the triangle containing it
+        """
+
+        true_x = x + constants.world_grid_origin * constants.grid_size
+        true_z = z + constants.world_grid_origin * constants.grid_size
 
         vertex_x = int(math.floor(true_x / 2.0))
         local_vertex_x = vertex_x & 15
         vertex_y = int(math.floor(true_z / 2.0))
         local_vertex_y = vertex_y & 15
 
-        p1 = self._heightmap[(local_vertex_x + 1, local_vertex_y)]
-        p2 = self._heightmap[(local_vertex_x, local_vertex_y + 1)]
+        row = constants.cell_vertex_count
+        index = local_vertex_x * row + local_vertex_y
+
+        p1 = heightmap[index + row]
+        p2 = heightmap[index + 1]
 
         sq_x = (true_x / 2) - vertex_x
         sq_z = (true_z / 2) - vertex_y
 
         height = 0
         if (sq_x + sq_z) < 1:
-            p0 = self._heightmap[(local_vertex_x, local_vertex_y)]
+            p0 = heightmap[index]
             height = p0
             height += (p1 - p0) * sq_x
             height += (p2 - p0) * sq_z
         else:
-            p3 = self._heightmap[(local_vertex_x + 1, local_vertex_y + 1)]
+            p3 = heightmap[index + row + 1]
             height = p3
             height += (p1 - p3) * (1.0 - sq_z)
             height += (p2 - p3) * (1.0 - sq_x)
 
         return height
 
+    def build_normals(self, get_neighbour=None) -> None:
+        """
+        Builds the per-vertex normal layer from the heightmap using central
+        differences. Edge vertices difference across the neighbouring cells
+        returned by get_neighbour(offset_x, offset_y) when supplied, and
+        are one-sided where a neighbour is missing
+        """
+
+        # Imported here as heightfield depends on this module
+        from . import heightfield
+
+        if not len(self._heightmap):
+            self._normals = array('f')
+            return
+
+        row = constants.cell_vertex_count
+        if get_neighbour is None:
+            field = heightfield.Heightfield(row, row, (0, 0))
+            field.add_cell(self, 0, 0)
+            self._normals = field.get_normals(0, 0, row)
+            return
+
+        # Stamp the 3x3 cell neighbourhood, this cell last
+        edge = row - 1
+        field = heightfield.Heightfield(3 * edge + 1, 3 * edge + 1, (0, 0))
+        for offset_x, offset_y in self.NEIGHBOUR_OFFSETS:
+            cell = get_neighbour(offset_x, offset_y)
+            if cell is not None:
+                field.add_cell(cell, (offset_x + 1) * edge, (offset_y + 1) * edge)
+
+        field.add_cell(self, edge, edge)
+        self._normals = field.get_normals(edge, edge, row)
+
+    def get_normal(self, x: float, z: float) -> core.Vec3:
+        """
+        Returns the terrain's normal at the supplied world x and z coordinate
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        return core.Vec3(*self._get_vertex_normal(
+            (x + origin) / constants.cell_vertex_size,
+            (z + origin) / constants.cell_vertex_size))
+
+    def get_slope(self, x: float, z: float) -> float:
+        """
+        Returns the terrain's slope in degrees from horizontal at the
+        supplied world x and z coordinate
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        normal = self._get_vertex_normal(
+            (x + origin) / constants.cell_vertex_size,
+            (z + origin) / constants.cell_vertex_size)
+
+        return math.degrees(math.acos(min(1.0, normal[2])))
+
+    def _get_vertex_normal(self, vertex_x: float, vertex_y: float) -> tuple:
+        """
+        Returns the (x, y, z) normal at the supplied global vertex space
+        position, blending the normals of the triangle get_height selects
+        with the same weights it interpolates heights with
+        """
+
+        normals = self.normals
+        if not len(normals):
+            return (0.0, 0.0, 1.0)
+
+        floor_x = math.floor(vertex_x)
+        floor_y = math.floor(vertex_y)
+        sq_x = vertex_x - floor_x
+        sq_z = vertex_y - floor_y
+
+        row = constants.cell_vertex_count
+        index = (int(floor_x) & 15) * row + (int(floor_y) & 15)
+        if (sq_x + sq_z) < 1:
+            corners = (index, index + row, index + 1)
+            weights = (1.0 - sq_x - sq_z, sq_x, sq_z)
+        else:
+            corners = (index + row + 1, index + row, index + 1)
+            weights = (sq_x + sq_z - 1.0, 1.0 - sq_z, 1.0 - sq_x)
+
+        normal_x = normal_y = normal_z = 0.0
+        for corner, weight in zip(corners, weights):
+            offset = corner * 3
+            normal_x += normals[offset] * weight
+            normal_y += normals[offset + 1] * weight
+            normal_z += normals[offset + 2] * weight
+
+        length = math.sqrt(normal_x * normal_x + normal_y * normal_y + normal_z * normal_z)
+        return (normal_x / length, normal_y / length, normal_z / length)
+
 class MapFileGrid(object):
     """
     Represents a grid in the map file
@@ -152,10 +547,19 @@ class MapFileGrid(object):
 
     notify = directNotify.newCategory('grid')
 
+    CELL_SLOTS = constants.grid_cell_count * constants.grid_cell_count
+    TILE_PRESENT = 1 << 31
+
+    # Encoded cell size by cell flags, filled in by scan
+    _cell_sizes = {}
+
     def __init__(self):
         self._x = 0
         self._y = 0
         self._cells = {}
+        self._cell_index = [None] * self.CELL_SLOTS
+        self._tiles = None
+        self._source = None
 
     @property
     def x(self) -> float:
@@ -167,11 +571,281 @@ class MapFileGrid(object):
 
     @property
     def cells(self) -> dict:
+        """
+        Cells keyed by their (x, y) coordinate within the grid
+        """
+
+        self.__load_cells()
         return self._cells
 
-    def read(self, reader: reader.BinaryReader) -> None:
+    @property
+    def cell_index(self) -> list:
+        """
+        Dense cell slot index, indexed by y * grid_cell_count + x
+        """
+
+        self.__load_cells()
+        return self._cell_index
+
+    @classmethod
+    def from_tiles(cls, x: int, y: int, flags, heights, world_area_ids, aura_ids=None, liquid_heights=None):
+        """
+        Creates a grid backed by contiguous per-slot tiles as returned by
+        get_tiles. Cells are only created when first accessed
+        """
+
+        file_grid = cls()
+        file_grid._x = x
+        file_grid._y = y
+        file_grid._tiles = (flags, heights, world_area_ids, aura_ids, liquid_heights)
+
+        return file_grid
+
+    @classmethod
+    def from_offsets(cls, x: int, y: int, reader: reader.BinaryReader, cell_offsets: array,
+                     layers: int = MapFileCell.ALL_LAYERS):
+        """
+        Creates a grid backed by the in-memory reader, with the cell offsets
+        per slot filled in by scan. Cells are only read when first accessed
+        """
+
+        file_grid = cls()
+        file_grid._x = x
+        file_grid._y = y
+        file_grid._source = (reader, cell_offsets, layers)
+
+        return file_grid
+
+    @classmethod
+    def scan(cls, data, offset: int = 0, cell_offsets: array = None) -> (int, int, int):
         """
-        Reads the map grids binary data
+        Walks the map grid binary data at offset within the supplied buffer
+        without decoding its cells. The offset of each cell is stored in
+        its slot of cell_offsets when supplied. Returns the grid's
+        coordinate and the offset just past its data
+        """
+
+        x, y, cell_count = struct.unpack_from('<3I', data, offset)
+        offset += 12
+
+        mask = constants.grid_cell_count - 1
+        sizes = cls._cell_sizes
+        for i in range(cell_count):
+            cell_x, cell_y, flags = struct.unpack_from('<3I', data, offset)
+            if cell_offsets is not None:
+                cell_offsets[(cell_y & mask) * constants.grid_cell_count + (cell_x & mask)] = offset
+
+            size = sizes.get(flags, None)
+            if size is None:
+                unsupported = flags & ~MapFileCell.ALL_LAYERS
+                if unsupported:
+                    cls.notify.error('%s is not implemented' % unsupported)
+
+                size = sizes[flags] = 12 + sum(
+                    layer_size for flag, layer_size in MapFileCell.LAYER_SIZES.items() if flags & flag)
+
+            offset += size
+
+        return (x, y, offset)
+
+    @classmethod
+    def parse_tiles(cls, data, offset: int = 0, layers: int = MapFileCell.ALL_LAYERS, out: tuple = None) -> tuple:
+        """
+        Parses the map grid binary data at offset within the supplied buffer
+        straight into the contiguous tiles returned by get_tiles, without
+        creating any cells. The flags, height and area tiles are written
+        into the zero filled buffers of out when supplied. Returns the
+        grid's (x, y, tiles)
+        """
+
+        mask = constants.grid_cell_count - 1
+        data = memoryview(data)
+
+        # Tile index, values per slot and typecode of each layer
+        layouts = {
+            MapFileCell.AREA_FLAG: (2, MapFileCell.AREA_COUNT, 'I'),
+            MapFileCell.HEIGHT_FLAG: (1, MapFileCell.HEIGHTMAP_LENGTH, 'f'),
+            MapFileCell.AURA_FLAG: (3, MapFileCell.AURA_COUNT, 'I'),
+            MapFileCell.LIQUID_FLAG: (4, MapFileCell.HEIGHTMAP_LENGTH, 'f')
+        }
+
+        if out is None:
+            out = (
+                array('I', bytes(4 * cls.CELL_SLOTS)),
+                array('f', bytes(4 * cls.CELL_SLOTS * MapFileCell.HEIGHTMAP_LENGTH)),
+                array('I', bytes(4 * cls.CELL_SLOTS * MapFileCell.AREA_COUNT)))
+
+        flags = out[0]
+        tiles = list(out) + [None, None]
+
+        x, y, cell_count = struct.unpack_from('<3I', data, offset)
+        offset += 12
+
+        for i in range(cell_count):
+            cell_x, cell_y, cell_flags = struct.unpack_from('<3I', data, offset)
+            offset += 12
+
+            unsupported = cell_flags & ~MapFileCell.ALL_LAYERS
+            if unsupported:
+                cls.notify.error('%s is not implemented' % unsupported)
+
+            slot = (cell_y & mask) * constants.grid_cell_count + (cell_x & mask)
+            flags[slot] = (cell_flags & layers) | cls.TILE_PRESENT
+
+            for flag, layer_size in MapFileCell.LAYER_SIZES.items():
+                if not cell_flags & flag:
+                    continue
+
+                if layers & flag:
+                    index, length, typecode = layouts[flag]
+                    if tiles[index] is None:
+                        tiles[index] = array(typecode, bytes(4 * cls.CELL_SLOTS * length))
+
+                    memoryview(tiles[index])[slot * length:(slot + 1) * length] = \
+                        data[offset:offset + layer_size].cast(typecode)
+
+                offset += layer_size
+
+        # Layers were copied in file order, which is little endian
+        if sys.byteorder != 'little':
+            for tile, typecode in zip(tiles[1:], 'fIIf'):
+                if tile is not None:
+                    swapped = array(typecode, tile)
+                    swapped.byteswap()
+                    memoryview(tile)[:] = memoryview(swapped)
+
+        return (x, y, tuple(tiles))
+
+    def get_tiles(self) -> tuple:
+        """
+        Returns the grid's layers as contiguous per-slot tiles: a uint32
+        flags tile (TILE_PRESENT marks populated slots), a float32 height
+        tile of 17x17 vertices per slot, a uint32 tile of 4 area ids per
+        slot, then matching aura id and liquid height tiles, or None when
+        no cell carries those layers
+        """
+
+        if self._tiles is not None:
+            return self._tiles
+
+        self.__load_cells()
+        height_length = MapFileCell.HEIGHTMAP_LENGTH
+        area_count = MapFileCell.AREA_COUNT
+        aura_count = MapFileCell.AURA_COUNT
+
+        flags = array('I', bytes(4 * self.CELL_SLOTS))
+        heights = array('f', bytes(4 * self.CELL_SLOTS * height_length))
+        world_area_ids = array('I', bytes(4 * self.CELL_SLOTS * area_count))
+        heights_view = memoryview(heights)
+        areas_view = memoryview(world_area_ids)
+
+        cells = [cell for cell in self._cell_index if cell is not None]
+        aura_ids = None
+        liquid_heights = None
+        if any(cell.flags & MapFileCell.AURA_FLAG for cell in cells):
+            aura_ids = array('I', bytes(4 * self.CELL_SLOTS * aura_count))
+
+        if any(cell.flags & MapFileCell.LIQUID_FLAG for cell in cells):
+            liquid_heights = array('f', bytes(4 * self.CELL_SLOTS * height_length))
+
+        for slot, cell in enumerate(self._cell_index):
+            if cell is None:
+                continue
+
+            flags[slot] = cell.flags | self.TILE_PRESENT
+            if len(cell.heights):
+                heights_view[slot * height_length:(slot + 1) * height_length] = memoryview(cell.heights)
+
+            if cell.flags & MapFileCell.AREA_FLAG:
+                areas_view[slot * area_count:(slot + 1) * area_count] = memoryview(cell.area_ids)
+
+            if cell.flags & MapFileCell.AURA_FLAG:
+                memoryview(aura_ids)[slot * aura_count:(slot + 1) * aura_count] = memoryview(cell.aura_ids)
+
+            if cell.flags & MapFileCell.LIQUID_FLAG:
+                memoryview(liquid_heights)[slot * height_length:(slot + 1) * height_length] = memoryview(cell.liquid_heightmap)
+
+        return (flags, heights, world_area_ids, aura_ids, liquid_heights)
+
+    def get_cell_slot(self, slot: int) -> MapFileCell:
+        """
+        Returns the cell in the supplied dense slot if present
+        """
+
+        cell = self._cell_index[slot]
+        if cell is None:
+            if self._tiles is not None:
+                cell = self.__load_tile_cell(slot)
+            elif self._source is not None:
+                cell = self.__load_source_cell(slot)
+
+        return cell
+
+    def __load_tile_cell(self, slot: int) -> MapFileCell:
+        """
+        Creates the cell in the supplied slot as a view into the grid's tiles
+        """
+
+        flags, heights, world_area_ids, aura_ids, liquid_heights = self._tiles
+        cell_flags = flags[slot]
+        if not cell_flags & self.TILE_PRESENT:
+            return None
+
+        height_length = MapFileCell.HEIGHTMAP_LENGTH
+        area_count = MapFileCell.AREA_COUNT
+        aura_count = MapFileCell.AURA_COUNT
+        height_range = slice(slot * height_length, (slot + 1) * height_length)
+
+        cell = MapFileCell.from_layers(
+            slot % constants.grid_cell_count,
+            slot // constants.grid_cell_count,
+            cell_flags & ~self.TILE_PRESENT,
+            heights[height_range],
+            world_area_ids[slot * area_count:(slot + 1) * area_count],
+            aura_ids[slot * aura_count:(slot + 1) * aura_count] if aura_ids is not None else None,
+            liquid_heights[height_range] if liquid_heights is not None else None)
+
+        self.add_cell(cell)
+        return cell
+
+    def __load_source_cell(self, slot: int) -> MapFileCell:
+        """
+        Reads the cell in the supplied slot from the grid's source reader
+        """
+
+        reader, cell_offsets, layers = self._source
+        offset = cell_offsets[slot]
+        if not offset:
+            return None
+
+        reader.seek(offset)
+        cell = MapFileCell()
+        cell.read(reader, True, layers)
+
+        self.add_cell(cell)
+        return cell
+
+    def __load_cells(self) -> None:
+        """
+        Creates every remaining cell backed by the grid's tiles or source
+        """
+
+        if self._tiles is None and self._source is None:
+            return
+
+        for slot in range(self.CELL_SLOTS):
+            if self._cell_index[slot] is None:
+                self.get_cell_slot(slot)
+
+        self._tiles = None
+        self._source = None
+
+    def read(self, reader: reader.BinaryReader, zero_copy: bool = False, cell_filter=None,
+             layers: int = MapFileCell.ALL_LAYERS) -> None:
+        """
+        Reads the map grids binary data. Cells for which cell_filter(x, y)
+        returns false are skipped without being decoded, as are cell layers
+        missing from the layers mask
         """
 
         self._x = reader.read_uint()
@@ -179,11 +853,168 @@ class MapFileGrid(object):
 
         cell_count = reader.read_uint()
         for i in range(cell_count):
+            if cell_filter is not None:
+                offset = reader.tell()
+                x, y = reader.read_struct('2I')
+                reader.seek(offset)
+
+                if not cell_filter(x, y):
+                    MapFileCell.skip(reader)
+                    continue
+
             cell = MapFileCell()
-            cell.read(reader)
+            cell.read(reader, zero_copy, layers)
 
-            index = (cell.x << 16, cell.y)
-            self._cells[index] = cell
+            self.add_cell(cell)
 
         if self.notify.getDebug():
-            self.notify.debug('Loaded %s cells' % len(self._cells))
\ No newline at end of file
+            self.notify.debug('Loaded %s cells' % len(self._cells))
+
+    def get_cell_count(self) -> int:
+        """
+        Returns the number of cells in the grid without materializing
+        tile or source backed cells
+        """
+
+        if self._source is not None:
+            return self.CELL_SLOTS - self._source[1].count(0)
+
+        if self._tiles is None:
+            return len(self._cells)
+
+        present = self.TILE_PRESENT
+        return sum(1 for flags in self._tiles[0] if flags & present)
+
+    def get_memory_size(self) -> int:
+        """
+        Returns an estimate of the grid's memory use in bytes, including
+        its resident cells and tiles
+        """
+
+        size = sys.getsizeof(self) + sys.getsizeof(self._cells) + sys.getsizeof(self._cell_index)
+        size += sum(cell.get_memory_size() for cell in self._cells.values())
+        if self._tiles is not None:
+            size += sum(sys.getsizeof(tile) for tile in self._tiles if tile is not None)
+
+        if self._source is not None:
+            size += sys.getsizeof(self._source[1])
+
+        return size
+
+    def add_cell(self, cell: MapFileCell) -> None:
+        """
+        Adds a cell to the grid and its dense slot index
+        """
+
+        mask = constants.grid_cell_count - 1
+        slot = (cell.y & mask) * constants.grid_cell_count + (cell.x & mask)
+
+        self._cells[(cell.x, cell.y)] = cell
+        self._cell_index[slot] = cell
+
+    def get_cell(self, vector: core.Vec2) -> MapFileCell:
+        """
+        Returns the cell containing the supplied world position
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        mask = constants.grid_cell_count - 1
+
+        cell_x = int(math.floor((vector.get_x() + origin) / constants.grid_cell_size)) & mask
+        cell_y = int(math.floor((vector.get_y() + origin) / constants.grid_cell_size)) & mask
+
+        return self.get_cell_slot(cell_y * constants.grid_cell_count + cell_x)
+
+    def get_world_area_id(self, vector: core.Vec2) -> int:
+        """
+        Returns the world area id at the supplied world position
+        """
+
+        cell = self.get_cell(vector)
+        if not cell:
+            return 0
+
+        return cell.get_world_area_id()
+
+    def get_terrain_height(self, vector: core.Vec2) -> float:
+        """
+        Returns the terrain height at the supplied world position
+        """
+
+        cell = self.get_cell(vector)
+        if not cell:
+            return 0
+
+        return cell.get_height(vector.get_x(), vector.get_y())
+
+    def get_liquid_height(self, vector: core.Vec2) -> float:
+        """
+        Returns the liquid surface height at the supplied world position,
+        or None if there is no liquid
+        """
+
+        cell = self.get_cell(vector)
+        if not cell:
+            return None
+
+        return cell.get_liquid_height(vector.get_x(), vector.get_y())
+
+    def get_terrain_normal(self, vector: core.Vec2) -> core.Vec3:
+        """
+        Returns the terrain normal at the supplied world position
+        """
+
+        cell = self.__get_normal_cell(vector)
+        if not cell:
+            return core.Vec3(0, 0, 1)
+
+        return cell.get_normal(vector.get_x(), vector.get_y())
+
+    def get_slope(self, vector: core.Vec2) -> float:
+        """
+        Returns the terrain slope in degrees at the supplied world position
+        """
+
+        cell = self.__get_normal_cell(vector)
+        if not cell:
+            return 0.0
+
+        return cell.get_slope(vector.get_x(), vector.get_y())
+
+    def __get_normal_cell(self, vector: core.Vec2) -> MapFileCell:
+        """
+        Returns the cell containing the supplied world position, building
+        its normals across its neighbours within the grid
+        """
+
+        cell = self.get_cell(vector)
+        if cell is None or cell.has_normals:
+            return cell
+
+        count = constants.grid_cell_count
+        cell_x = cell.x & (count - 1)
+        cell_y = cell.y & (count - 1)
+
+        def get_neighbour(offset_x: int, offset_y: int) -> MapFileCell:
+            x = cell_x + offset_x
+            y = cell_y + offset_y
+            return self.get_cell_slot(y * count + x) if 0 <= x < count and 0 <= y < count else None
+
+        cell.build_normals(get_neighbour)
+        return cell
+
+    @classmethod
+    def skip(cls, reader: reader.BinaryReader) -> (int, int):
+        """
+        Seeks past the map grids binary data without decoding its cells.
+        Returns the grid's coordinate
+        """
+
+        x = reader.read_uint()
+        y = reader.read_uint()
+
+        cell_count = reader.read_uint()
+        for i in range(cell_count):
+            MapFileCell.skip(reader)
+
+        return (x, y)
\ No newline at end of file
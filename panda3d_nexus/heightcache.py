@@ -0,0 +1,204 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from collections import OrderedDict
+import math
+
+from . import constants
+
+class HeightCursor(object):
+    """
+    Remembers the last grid cell resolved by a single caller so repeated
+    lookups inside the same cell skip the grid and cell resolution. The
+    cursor is dropped whenever the map's grids change
+    """
+
+    notify = directNotify.newCategory('height-cursor')
+
+    def __init__(self, map_file):
+        self._map_file = map_file
+        self._generation = -1
+        self._cell = None
+        self._min_x = 0.0
+        self._min_y = 0.0
+        self._max_x = 0.0
+        self._max_y = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def get_terrain_height(self, vector: core.Vec2) -> float:
+        """
+        Returns the terrain height at the supplied position
+        """
+
+        return self.get_height(vector.get_x(), vector.get_y())
+
+    def get_height(self, x: float, y: float) -> float:
+        """
+        Returns the terrain height at the supplied world x and y coordinate
+        """
+
+        if (self._generation == self._map_file.generation and
+                self._min_x <= x < self._max_x and self._min_y <= y < self._max_y):
+            self._hits += 1
+            cell = self._cell
+        else:
+            self._misses += 1
+            cell = self.__resolve(x, y)
+
+        if cell is None:
+            return 0
+
+        return cell.get_height(x, y)
+
+    def __resolve(self, x: float, y: float):
+        """
+        Resolves and remembers the cell containing the supplied position
+        """
+
+        vector = core.Vec2(x, y)
+        file_grid = self._map_file.get_grid(vector)
+        self._cell = file_grid.get_cell(vector) if file_grid is not None else None
+        self._generation = self._map_file.generation
+
+        origin = constants.world_grid_origin * constants.grid_size
+        size = constants.grid_cell_size
+        self._min_x = math.floor((x + origin) / size) * size - origin
+        self._min_y = math.floor((y + origin) / size) * size - origin
+        self._max_x = self._min_x + size
+        self._max_y = self._min_y + size
+
+        return self._cell
+
+class HeightCache(object):
+    """
+    Bounded LRU of terrain heights keyed by quantized position. Heights
+    are sampled at the centre of each resolution sized bucket, so nearby
+    lookups share an entry and return identical results
+    """
+
+    notify = directNotify.newCategory('height-cache')
+
+    SIZE = 4096
+    RESOLUTION = 0.125
+
+    def __init__(self, map_file, size: int = SIZE, resolution: float = RESOLUTION):
+        if size < 1:
+            raise ValueError('Invalid height cache size: %s' % size)
+
+        if resolution <= 0:
+            raise ValueError('Invalid height cache resolution: %s' % resolution)
+
+        self._map_file = map_file
+        self._cursor = HeightCursor(map_file)
+        self._generation = map_file.generation
+        self._size = size
+        self._resolution = resolution
+        self._scale = 1.0 / resolution
+        self._heights = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def resolution(self) -> float:
+        return self._resolution
+
+    def get_terrain_height(self, vector: core.Vec2) -> float:
+        """
+        Returns the terrain height at the supplied position
+        """
+
+        return self.get_height(vector.get_x(), vector.get_y())
+
+    def get_height(self, x: float, y: float) -> float:
+        """
+        Returns the terrain height of the bucket containing the supplied
+        world x and y coordinate
+        """
+
+        if self._generation != self._map_file.generation:
+            self.clear()
+
+        key = (int(math.floor(x * self._scale)), int(math.floor(y * self._scale)))
+        heights = self._heights
+        height = heights.get(key, None)
+        if height is not None:
+            self._hits += 1
+            heights.move_to_end(key)
+            return height
+
+        self._misses += 1
+        resolution = self._resolution
+        height = self._cursor.get_height((key[0] + 0.5) * resolution, (key[1] + 0.5) * resolution)
+
+        heights[key] = height
+        if len(heights) > self._size:
+            heights.popitem(last=False)
+            self._evictions += 1
+
+        return height
+
+    def clear(self) -> None:
+        """
+        Drops every cached height
+        """
+
+        self._heights.clear()
+        self._generation = self._map_file.generation
+
+    def get_stats(self) -> dict:
+        """
+        Returns the cache's occupancy and hit rate counters
+        """
+
+        lookups = self._hits + self._misses
+        return {
+            'resident': len(self._heights),
+            'capacity': self._size,
+            'resolution': self._resolution,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'hit_rate': self._hits / lookups if lookups else 0.0,
+            'cursor_hits': self._cursor.hits,
+            'cursor_misses': self._cursor.misses
+        }
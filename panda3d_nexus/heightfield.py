@@ -0,0 +1,215 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+import math
+
+from . import grid, constants
+
+class Heightfield(object):
+    """
+    Contiguous float32 heightfield at vertex resolution. Vertices are stored
+    row-major, indexed by y * width + x, with vertex (0, 0) at the world
+    position origin and neighbouring vertices spacing world units apart
+    """
+
+    notify = directNotify.newCategory('heightfield')
+
+    NODATA = -32768.0
+
+    def __init__(self, width: int, height: int, origin: tuple, nodata: float = NODATA):
+        self._width = width
+        self._height = height
+        self._origin = origin
+        self._nodata = nodata
+        self._data = array('f', [nodata]) * (width * height)
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def origin(self) -> tuple:
+        return self._origin
+
+    @property
+    def spacing(self) -> int:
+        return constants.cell_vertex_size
+
+    @property
+    def nodata(self) -> float:
+        return self._nodata
+
+    @property
+    def data(self) -> array:
+        return self._data
+
+    @classmethod
+    def from_map(cls, map_file, min_grid: tuple = None, max_grid: tuple = None, nodata: float = NODATA):
+        """
+        Assembles the map's grids within the inclusive grid coordinate
+        rectangle into a single heightfield. Defaults to the extent of the
+        map's grids. Vertices of missing cells are set to nodata
+        """
+
+        coords = map_file.get_grid_coords()
+        if min_grid is None:
+            min_grid = (min(x for x, y in coords), min(y for x, y in coords)) if coords else (0, 0)
+
+        if max_grid is None:
+            max_grid = (max(x for x, y in coords), max(y for x, y in coords)) if coords else min_grid
+
+        grid_vertices = constants.grid_size // constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size
+        heightfield = cls(
+            (max_grid[0] - min_grid[0] + 1) * grid_vertices + 1,
+            (max_grid[1] - min_grid[1] + 1) * grid_vertices + 1,
+            (min_grid[0] * constants.grid_size - origin, min_grid[1] * constants.grid_size - origin),
+            nodata)
+
+        for x, y in coords:
+            if min_grid[0] <= x <= max_grid[0] and min_grid[1] <= y <= max_grid[1]:
+                heightfield.add_grid(map_file.get_grid_exact(core.Vec2(x, y)))
+
+        return heightfield
+
+    @classmethod
+    def from_grid(cls, file_grid: grid.MapFileGrid, nodata: float = NODATA):
+        """
+        Assembles a single grid into a heightfield
+        """
+
+        grid_vertices = constants.grid_size // constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size
+        heightfield = cls(
+            grid_vertices + 1,
+            grid_vertices + 1,
+            (file_grid.x * constants.grid_size - origin, file_grid.y * constants.grid_size - origin),
+            nodata)
+
+        heightfield.add_grid(file_grid)
+        return heightfield
+
+    def add_grid(self, file_grid: grid.MapFileGrid) -> None:
+        """
+        Stamps the grid's cell heightmaps into the heightfield. Cells share
+        their edge vertices with their neighbours
+        """
+
+        grid_vertices = constants.grid_size // constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size
+        base_x = (file_grid.x * constants.grid_size - origin - self._origin[0]) // constants.cell_vertex_size
+        base_y = (file_grid.y * constants.grid_size - origin - self._origin[1]) // constants.cell_vertex_size
+        if base_x < 0 or base_y < 0 or base_x + grid_vertices >= self._width or base_y + grid_vertices >= self._height:
+            self.notify.warning('Grid (%s, %s) is outside of the heightfield' % (file_grid.x, file_grid.y))
+            return
+
+        cell_vertices = constants.cell_vertex_count - 1
+        for slot in range(grid.MapFileGrid.CELL_SLOTS):
+            cell = file_grid.get_cell_slot(slot)
+            if cell is not None:
+                self.add_cell(cell,
+                    base_x + (slot % constants.grid_cell_count) * cell_vertices,
+                    base_y + (slot // constants.grid_cell_count) * cell_vertices)
+
+    def add_cell(self, cell: grid.MapFileCell, x: int, y: int) -> None:
+        """
+        Stamps the cell's heightmap into the heightfield with its first
+        vertex at the supplied vertex coordinate
+        """
+
+        if not len(cell.heights):
+            return
+
+        row = constants.cell_vertex_count
+        data = memoryview(self._data)
+        heightmap = memoryview(cell.heights)
+
+        # Each heightmap run of fixed x becomes a strided column here
+        start = y * self._width + x
+        for column in range(row):
+            offset = start + column
+            data[offset:offset + row * self._width:self._width] = heightmap[column * row:(column + 1) * row]
+
+    def get_normals(self, x: int, y: int, size: int) -> array:
+        """
+        Returns the flat (x, y, z) normals of the size by size vertex block
+        at the supplied vertex coordinate, indexed by (x * size + y) * 3
+        like a cell heightmap. Slopes are central differences, one-sided
+        beside the heightfield's edges and nodata vertices
+        """
+
+        width = self._width
+        height = self._height
+        nodata = self._nodata
+        spacing = self.spacing
+        data = self._data.tolist()
+
+        normals = array('f', bytes(4 * 3 * size * size))
+        offset = 0
+        for vertex_x in range(x, x + size):
+            for vertex_y in range(y, y + size):
+                index = vertex_y * width + vertex_x
+                previous_x = index - 1 if vertex_x > 0 and data[index - 1] != nodata else index
+                next_x = index + 1 if vertex_x < width - 1 and data[index + 1] != nodata else index
+                previous_y = index - width if vertex_y > 0 and data[index - width] != nodata else index
+                next_y = index + width if vertex_y < height - 1 and data[index + width] != nodata else index
+
+                slope_x = slope_y = 0.0
+                if next_x != previous_x:
+                    slope_x = (data[previous_x] - data[next_x]) / ((next_x - previous_x) * spacing)
+
+                if next_y != previous_y:
+                    slope_y = (data[previous_y] - data[next_y]) / ((next_y - previous_y) // width * spacing)
+
+                length = math.sqrt(slope_x * slope_x + slope_y * slope_y + 1.0)
+                normals[offset] = slope_x / length
+                normals[offset + 1] = slope_y / length
+                normals[offset + 2] = 1.0 / length
+                offset += 3
+
+        return normals
+
+    def get_vertex(self, x: int, y: int) -> float:
+        """
+        Returns the height of the supplied vertex
+        """
+
+        return self._data[y * self._width + x]
+
+    def get_row(self, y: int) -> array:
+        """
+        Returns a copy of the supplied vertex row
+        """
+
+        return self._data[y * self._width:(y + 1) * self._width]
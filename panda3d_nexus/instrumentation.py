@@ -0,0 +1,311 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+import functools
+import inspect
+import time
+import weakref
+
+# Lookup methods of each instrumented class as (name, lookup) pairs
+_lookup_methods = {}
+
+# Counting subclass of each instrumented class
+_instrumented_classes = {}
+
+class LookupCounter(object):
+    """
+    Call count of a single lookup along with the sampling mask of its stats
+    """
+
+    __slots__ = ('count', 'mask')
+
+    def __init__(self, mask: int):
+        self.count = 0
+        self.mask = mask
+
+class MapStats(object):
+    """
+    Collects load and lookup instrumentation for a map file. Load phases
+    are timed once per phase or grid and lookups are counted on every
+    call but only every sample_interval-th call is timed. Counting still
+    adds a wrapper call of about 0.15us to every lookup, a few percent of
+    the cheapest point queries; disable the stats where that matters
+    """
+
+    notify = directNotify.newCategory('map-stats')
+
+    SAMPLE_INTERVAL = 64
+    HISTOGRAM_BUCKETS = 24
+
+    def __init__(self, sample_interval: int = SAMPLE_INTERVAL):
+        if sample_interval < 1 or sample_interval & (sample_interval - 1):
+            raise ValueError('Sample interval must be a power of two: %s' % sample_interval)
+
+        self._enabled = True
+        self._sample_interval = sample_interval
+        self._sample_mask = sample_interval - 1
+        self._phases = {}
+        self._bytes_read = 0
+        self._grids_parsed = 0
+        self._cells_parsed = 0
+        self._counters = {}
+        self._latencies = {}
+        self._targets = weakref.WeakSet()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool) -> None:
+        self._enabled = enabled
+        for target in list(self._targets):
+            self.__bind(target)
+
+    @property
+    def sample_interval(self) -> int:
+        return self._sample_interval
+
+    @property
+    def phases(self) -> dict:
+        """
+        Accumulated seconds spent in each load phase
+        """
+
+        return self._phases
+
+    @property
+    def bytes_read(self) -> int:
+        return self._bytes_read
+
+    @property
+    def grids_parsed(self) -> int:
+        return self._grids_parsed
+
+    @property
+    def cells_parsed(self) -> int:
+        return self._cells_parsed
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        """
+        Adds the supplied duration to a load phase
+        """
+
+        if self._enabled:
+            self._phases[phase] = self._phases.get(phase, 0.0) + seconds
+
+    def add_bytes(self, size: int) -> None:
+        """
+        Adds to the count of bytes consumed from the map source
+        """
+
+        if self._enabled:
+            self._bytes_read += size
+
+    def add_grid(self, cell_count: int) -> None:
+        """
+        Counts a parsed grid and its cells
+        """
+
+        if self._enabled:
+            self._grids_parsed += 1
+            self._cells_parsed += cell_count
+
+    def instrument(self, target) -> None:
+        """
+        Instruments the timed_lookup methods of target. While the stats are
+        enabled the target is switched to a subclass whose lookups count
+        each call; while disabled the undecorated methods are called directly
+        """
+
+        base = getattr(type(target), '_instrumented_base', type(target))
+        target._lookup_stats = self
+        target._lookup_counters = [self.get_counter(lookup) for name, lookup in _get_lookup_methods(base)]
+
+        self._targets.add(target)
+        self.__bind(target)
+
+    def __bind(self, target) -> None:
+        """
+        Switches target to or from its counting subclass
+        """
+
+        base = getattr(type(target), '_instrumented_base', type(target))
+        target.__class__ = _get_instrumented_class(base) if self._enabled else base
+
+    def get_counter(self, lookup: str) -> LookupCounter:
+        """
+        Returns the call counter of the supplied lookup
+        """
+
+        counter = self._counters.get(lookup, None)
+        if counter is None:
+            counter = self._counters[lookup] = LookupCounter(self._sample_mask)
+
+        return counter
+
+    def add_latency(self, lookup: str, seconds: float) -> None:
+        """
+        Records a sampled lookup latency in a power of two microsecond histogram
+        """
+
+        histogram = self._latencies.get(lookup, None)
+        if histogram is None:
+            histogram = self._latencies[lookup] = [0] * self.HISTOGRAM_BUCKETS
+
+        bucket = min(int(seconds * 1000000).bit_length(), self.HISTOGRAM_BUCKETS - 1)
+        histogram[bucket] += 1
+
+    def get_lookup_count(self, lookup: str) -> int:
+        """
+        Returns the number of calls made to the supplied lookup
+        """
+
+        counter = self._counters.get(lookup, None)
+        return counter.count if counter is not None else 0
+
+    def get_histogram(self, lookup: str) -> dict:
+        """
+        Returns the sampled latencies of a lookup keyed by the bucket's
+        upper bound in microseconds
+        """
+
+        histogram = self._latencies.get(lookup, ())
+        return {1 << bucket: count for bucket, count in enumerate(histogram) if count}
+
+    def reset(self) -> None:
+        """
+        Clears every counter, timer and histogram
+        """
+
+        self._phases = {}
+        self._bytes_read = 0
+        self._grids_parsed = 0
+        self._cells_parsed = 0
+        self._latencies = {}
+
+        # Counters are shared with the instrumented targets, so zero them in place
+        for counter in self._counters.values():
+            counter.count = 0
+
+    def as_dict(self) -> dict:
+        """
+        Returns a json serializable snapshot of the collected stats
+        """
+
+        return {
+            'phases': dict(self._phases),
+            'bytes_read': self._bytes_read,
+            'grids_parsed': self._grids_parsed,
+            'cells_parsed': self._cells_parsed,
+            'lookups': {lookup: {
+                'count': counter.count,
+                'histogram_us': self.get_histogram(lookup)
+            } for lookup, counter in self._counters.items() if counter.count}
+        }
+
+def timed_lookup(lookup: str):
+    """
+    Marks a MapFile query as a lookup counted, and periodically timed, by
+    the map's stats object. The method itself is left undecorated so it
+    costs nothing while the stats are disabled; MapStats.instrument swaps
+    in a counting subclass while they are enabled
+    """
+
+    def decorator(func):
+        func.timed_lookup = lookup
+        return func
+
+    return decorator
+
+# Counting wrapper of a lookup, compiled with the lookup's own parameters
+# since forwarding *args and **kwargs costs several times the count itself
+_WRAPPER_SOURCE = """
+def wrapper(self, {parameters}):
+    counter = self._lookup_counters[index]
+    counter.count += 1
+    if counter.count & counter.mask:
+        return func(self, {arguments})
+
+    start = perf_counter()
+    result = func(self, {arguments})
+    self._lookup_stats.add_latency(lookup, perf_counter() - start)
+
+    return result
+"""
+
+def _wrap(func, lookup: str, index: int):
+    """
+    Returns a wrapper around the lookup method that counts every call and
+    times every sample_interval-th one. The wrapper lives on the counting
+    subclass and finds its counter on the instance, so no instance holds
+    a reference back to itself
+    """
+
+    parameters = list(inspect.signature(func).parameters.values())[1:]
+    if all(parameter.kind == parameter.POSITIONAL_OR_KEYWORD for parameter in parameters):
+        names = [parameter.name for parameter in parameters]
+        arguments = ', '.join(names)
+    else:
+        names = ['*args', '**kwargs']
+        arguments = '*args, **kwargs'
+
+    namespace = {'func': func, 'lookup': lookup, 'index': index, 'perf_counter': time.perf_counter}
+    exec(_WRAPPER_SOURCE.format(parameters=', '.join(names), arguments=arguments), namespace)
+
+    wrapper = functools.wraps(func)(namespace['wrapper'])
+    wrapper.__defaults__ = func.__defaults__
+
+    return wrapper
+
+def _get_instrumented_class(cls) -> type:
+    """
+    Returns the subclass of cls whose timed_lookup methods count their calls
+    """
+
+    instrumented = _instrumented_classes.get(cls, None)
+    if instrumented is None:
+        namespace = {'__slots__': (), '__module__': cls.__module__, '_instrumented_base': cls}
+        for index, (name, lookup) in enumerate(_get_lookup_methods(cls)):
+            namespace[name] = _wrap(getattr(cls, name), lookup, index)
+
+        instrumented = _instrumented_classes[cls] = type(cls.__name__, (cls,), namespace)
+
+    return instrumented
+
+def _get_lookup_methods(cls) -> list:
+    """
+    Returns the (name, lookup) pairs of the supplied class's timed_lookup
+    methods
+    """
+
+    methods = _lookup_methods.get(cls, None)
+    if methods is None:
+        methods = _lookup_methods[cls] = [(name, getattr(cls, name).timed_lookup)
+            for name in dir(cls) if hasattr(getattr(cls, name, None), 'timed_lookup')]
+
+    return methods
@@ -28,9 +28,68 @@ from panda3d import core
 from direct.directnotify.DirectNotifyGlobal import directNotify
 from direct.stdpy.file import *
 
-from . import reader, grid, constants
+from . import reader, grid, area, heightfield, pyramid, raycast, collision, instrumentation, heightcache, mapcache, service, constants
 
+from array import array
+import asyncio
+from collections import OrderedDict
+from concurrent import futures
 import math
+import mmap
+import os
+import queue
+import sys
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def _get_shared_tiles(view: memoryview, index: int) -> tuple:
+    """
+    Returns the flags, height and area tiles of the grid in the supplied
+    slot of a read_parallel tile segment
+    """
+
+    slots = grid.MapFileGrid.CELL_SLOTS
+    sizes = (slots * 4, slots * grid.MapFileCell.HEIGHTMAP_LENGTH * 4, slots * grid.MapFileCell.AREA_COUNT * 4)
+
+    tiles = []
+    offset = index * sum(sizes)
+    for size, typecode in zip(sizes, 'IfI'):
+        tiles.append(view[offset:offset + size].cast(typecode))
+        offset += size
+
+    return tuple(tiles)
+
+def _read_grids(filepath: str, name: str, index: int, offsets: list,
+                layers: int = grid.MapFileCell.ALL_LAYERS) -> list:
+    """
+    Parses the grids at the supplied byte offsets into their slots of the
+    shared tile segment from a read_parallel worker process
+    """
+
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        buffer = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    finally:
+        os.close(fd)
+
+    memory = service.attach_segment(name)
+    results = []
+    try:
+        with buffer:
+            for slot, offset in enumerate(offsets, index):
+                x, y, tiles = grid.MapFileGrid.parse_tiles(
+                    buffer, offset, layers, _get_shared_tiles(memory.buf, slot))
+                results.append((x, y, tiles[3], tiles[4]))
+                del tiles
+    finally:
+        memory.close()
+
+    return results
 
 class MapFile(object):
     """
@@ -46,6 +105,36 @@ class MapFile(object):
     def __init__(self):
         self._asset = None
         self._grids = {}
+        self._buffer = None
+
+        self._reader = None
+        self._grid_offsets = None
+        self._cache_size = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._cache_evictions = 0
+
+        self._pyramids = {}
+        self._pyramid_level = pyramid.HeightPyramid.BASE_LEVEL
+        self._raycaster = None
+        self._collider = None
+        self._area_index = None
+
+        self._layers = grid.MapFileCell.ALL_LAYERS
+
+        self._filepath = None
+        self._regions = None
+        self._region_offsets = None
+
+        self._stats = instrumentation.MapStats()
+        self._stats.instrument(self)
+
+        # Called with the map file after each load completes
+        self.load_callback = None
+        self._load_progress = (0, 0)
+
+        self._generation = 0
+        self._height_cache = None
 
     @property
     def asset(self) -> str:
@@ -53,40 +142,789 @@ class MapFile(object):
 
     @property
     def grids(self) -> dict:
+        """
+        Loaded grids. In lazy mode this only holds the resident grids
+        """
+
         return self._grids
 
+    @property
+    def lazy(self) -> bool:
+        return self._grid_offsets is not None
+
+    @property
+    def stats(self) -> instrumentation.MapStats:
+        return self._stats
+
+    @property
+    def generation(self) -> int:
+        """
+        Counter bumped whenever grids are added or removed, used to
+        invalidate memoized lookups
+        """
+
+        return self._generation
+
     @classmethod
-    def read(cls, filepath: str):
+    def read(cls, filepath: str, lazy: bool = False, cache_size: int = 0, bounds: tuple = None,
+             layers: int = grid.MapFileCell.ALL_LAYERS):
         """
-        Reads the map file from disk
+        Reads the map file from disk. In lazy mode only the grid offsets are
+        indexed and grids are parsed on first request, keeping at most
+        cache_size grids resident (0 for unbounded). When a world space
+        (min_x, min_y, max_x, max_y) bounds is supplied only the grids and
+        cells it covers are decoded; see add_region and remove_region.
+        Cell layers missing from the layers flag mask are seeked past
         """
 
         map_file = cls()
         map_file.notify.info('Reading map file: %s' % filepath)
+        map_file._layers = layers
+
+        if bounds is not None:
+            map_file._filepath = filepath
+            map_file._regions = [map_file.__get_cell_rect(bounds)]
+
+        if not lazy:
+            with open(filepath, 'rb') as f:
+                bin_reader = reader.BinaryReader(f)
+                map_file.parse(bin_reader)
+
+            return map_file
+
+        map_file._buffer = map_file.__map_file(filepath)
+        map_file._reader = reader.BinaryReader(map_file._buffer)
+        map_file._grids = OrderedDict()
+        map_file._cache_size = cache_size
+        map_file.parse(map_file._reader, lazy=True)
+
+        return map_file
+
+    @classmethod
+    def iter_grids(cls, filepath: str, layers: int = grid.MapFileCell.ALL_LAYERS):
+        """
+        Yields the map file's grids one at a time straight from disk,
+        keeping only the current grid in memory
+        """
+
+        map_file = cls()
+        map_file._layers = layers
+        map_file.notify.info('Streaming map file: %s' % filepath)
+
         with open(filepath, 'rb') as f:
             bin_reader = reader.BinaryReader(f)
-            map_file.parse(bin_reader)
+            grid_count = map_file.__read_preamble(bin_reader)
+            for file_grid in map_file.__read_grids(bin_reader, grid_count):
+                yield file_grid
+
+    @classmethod
+    async def read_async(cls, filepath: str, progress=None, layers: int = grid.MapFileCell.ALL_LAYERS):
+        """
+        Awaitable read for asyncio event loops. See load_async
+        """
+
+        map_file = cls()
+        map_file._layers = layers
+        await map_file.load_async(filepath, progress)
+
+        return map_file
+
+    async def load_async(self, filepath: str, progress=None) -> None:
+        """
+        Loads the map file into this map on a worker thread without blocking
+        the event loop. Grids are inserted, and queryable, as soon as they are
+        decoded and progress(loaded, total) is called after each one
+        """
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wakeup():
+            # The loop may already be closed when a cancelled load's worker
+            # reaches its next grid
+            if loop.is_closed():
+                return
+
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass
+
+        stop = threading.Event()
+        pending = self.__start_loader(filepath, stop, wakeup)
+
+        try:
+            while True:
+                ready.clear()
+                if self.__drain_loader(pending, progress):
+                    break
+
+                await ready.wait()
+        finally:
+            stop.set()
+
+    def load_task(self, filepath: str, progress=None):
+        """
+        Returns a task function for the Panda3D task manager that loads the
+        map file into this map on a worker thread, inserting the decoded
+        grids each frame until the load completes
+        """
+
+        pending = self.__start_loader(filepath, threading.Event())
+
+        def task(task):
+            if self.__drain_loader(pending, progress):
+                return task.done
+
+            return task.cont
+
+        return task
+
+    def get_load_progress(self) -> (int, int):
+        """
+        Returns the loaded and total grid counts of the current async load
+        """
+
+        return self._load_progress
+
+    def __start_loader(self, filepath: str, stop: threading.Event, wakeup=None) -> queue.Queue:
+        """
+        Starts decoding the map file on a worker thread until stop is set,
+        returning the queue its results are posted to
+        """
+
+        self.notify.info('Reading map file asynchronously: %s' % filepath)
+
+        pending = queue.Queue()
+        thread = threading.Thread(
+            target=self.__run_loader,
+            args=(filepath, pending, stop, wakeup),
+            name='map-loader',
+            daemon=True)
+        thread.start()
+
+        return pending
+
+    def __run_loader(self, filepath: str, pending: queue.Queue, stop: threading.Event, wakeup) -> None:
+        """
+        Worker thread body. Posts the grid count, then each decoded grid,
+        then either an error or completion. Returns early once stop is set
+        """
+
+        try:
+            with open(filepath, 'rb') as f:
+                bin_reader = reader.BinaryReader(f)
+                grid_count = self.__read_preamble(bin_reader)
+                pending.put(('count', grid_count))
+                if wakeup is not None:
+                    wakeup()
+
+                for file_grid in self.__read_grids(bin_reader, grid_count):
+                    if stop.is_set():
+                        return
+
+                    pending.put(('grid', file_grid))
+                    if wakeup is not None:
+                        wakeup()
+
+                self._stats.add_bytes(bin_reader.tell())
+
+            pending.put(('done', None))
+        except Exception as e:
+            pending.put(('error', e))
+
+        if wakeup is not None and not stop.is_set():
+            wakeup()
+
+    def __drain_loader(self, pending: queue.Queue, progress) -> bool:
+        """
+        Inserts the grids decoded so far on the calling thread. Returns
+        true once the load has completed and raises the worker's error
+        """
+
+        while True:
+            try:
+                kind, value = pending.get_nowait()
+            except queue.Empty:
+                return False
+
+            if kind == 'error':
+                raise value
+
+            if kind == 'done':
+                self.__finish_load()
+                return True
+
+            loaded, total = self._load_progress
+            if kind == 'count':
+                self._load_progress = (0, value)
+            else:
+                self.__insert_grids((value,))
+                self._load_progress = (loaded + 1, total)
+
+            if progress is not None:
+                progress(*self._load_progress)
+
+    @classmethod
+    def read_parallel(cls, filepath: str, workers: int = None, layers: int = grid.MapFileCell.ALL_LAYERS):
+        """
+        Reads the map file from disk, splitting the grids across a pool of
+        worker processes
+        """
+
+        map_file = cls()
+        map_file.notify.info('Reading map file in parallel: %s' % filepath)
+
+        # Index the grids through a mapping; the workers do all the decoding
+        offsets = list(map_file.__index_file(filepath).values())
+
+        # Hand out a few contiguous batches per worker to balance uneven grids
+        workers = workers or os.cpu_count() or 1
+        batch_size = max(1, int(math.ceil(len(offsets) / (workers * 4.0))))
+        batches = [offsets[i:i + batch_size] for i in range(0, len(offsets), batch_size)]
+
+        start = time.perf_counter()
+        memory = service.create_segment(max(1, len(offsets) * sum(mapcache.get_tile_sizes()[:3])))
+        try:
+            names = [memory.name] * len(batches)
+            indices = range(0, len(offsets), batch_size)
+            with futures.ProcessPoolExecutor(workers) as executor:
+                index = 0
+                for results in executor.map(_read_grids, [filepath] * len(batches), names, indices, batches,
+                                            [layers] * len(batches)):
+                    for x, y, aura_ids, liquid_heights in results:
+                        tiles = []
+                        for view in _get_shared_tiles(memory.buf, index):
+                            with view:
+                                tile = array(view.format)
+                                tile.frombytes(view.cast('B'))
+                                tiles.append(tile)
+
+                        file_grid = grid.MapFileGrid.from_tiles(x, y, *tiles, aura_ids, liquid_heights)
+                        map_file._grids[x << 16 | y] = file_grid
+                        map_file._stats.add_grid(file_grid.get_cell_count())
+                        index += 1
+        finally:
+            memory.close()
+            service.unlink_segment(memory)
+
+        map_file._stats.add_phase('parallel', time.perf_counter() - start)
+        map_file._stats.add_bytes(os.path.getsize(filepath))
+        map_file.__finish_load()
+
+        return map_file
+
+    @classmethod
+    def scan_grids(cls, filepath: str) -> (str, dict):
+        """
+        Indexes the map file's grids without decoding them. Returns the
+        asset name and the byte offset of each grid keyed by its (x, y)
+        """
+
+        map_file = cls()
+        offsets = map_file.__index_file(filepath)
+
+        return (map_file.asset, {(index >> 16, index & 0xFFFF): offset for index, offset in offsets.items()})
+
+    def __index_file(self, filepath: str) -> dict:
+        """
+        Reads the header of the map file and returns the byte offset of
+        each grid, scanning a mapping of the file
+        """
+
+        with self.__map_file(filepath) as buffer:
+            bin_reader = reader.BinaryReader(buffer)
+            grid_count = self.__read_preamble(bin_reader)
+            offsets = self.__scan_grids(buffer, bin_reader.tell(), grid_count)
+            del bin_reader
+
+        return offsets
+
+    @classmethod
+    def open_mmap(cls, filepath: str, layers: int = grid.MapFileCell.ALL_LAYERS):
+        """
+        Memory maps the map file from disk. Only the cell offsets are
+        indexed up front; cells are read on first access with their heights
+        and area ids served as views into the mapped buffer, letting
+        processes share its pages
+        """
+
+        map_file = cls()
+        map_file._layers = layers
+        map_file.notify.info('Mapping map file: %s' % filepath)
+
+        map_file._buffer = map_file.__map_file(filepath)
+        bin_reader = reader.BinaryReader(map_file._buffer)
+
+        start = time.perf_counter()
+        grid_count = map_file.__read_preamble(bin_reader)
+        map_file._stats.add_phase('header', time.perf_counter() - start)
+        map_file._stats.add_bytes(bin_reader.tell())
+
+        map_file.__insert_grids(map_file.__scan_cells(bin_reader, grid_count))
+        map_file.__finish_load()
 
         return map_file
 
-    def parse(self, reader: reader.BinaryReader) -> None:
+    @classmethod
+    def read_cache(cls, filepath: str, verify: bool = True):
+        """
+        Memory maps a map cache written by write_cache. Grids are served
+        as views into the mapped tiles without decoding any cells
+        """
+
+        map_file = cls()
+        map_file.notify.info('Reading map cache: %s' % filepath)
+
+        map_file._buffer = map_file.__map_file(filepath)
+        map_file.parse_cache(map_file._buffer, verify)
+
+        return map_file
+
+    @classmethod
+    def read_shared(cls, name: str, verify: bool = False):
+        """
+        Attaches read-only to a map published into shared memory by
+        service.MapService. Grids are served as views into the segment
+        """
+
+        map_file = cls()
+        map_file.notify.info('Attaching shared map: %s' % name)
+
+        map_file._buffer = service.attach_segment(name)
+        map_file.parse_cache(map_file._buffer.buf.toreadonly(), verify)
+
+        return map_file
+
+    def __map_file(self, filepath: str) -> mmap.mmap:
+        """
+        Maps the supplied file read-only into memory
+        """
+
+        start = time.perf_counter()
+        fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            return mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+            self._stats.add_phase('open', time.perf_counter() - start)
+
+    def close(self) -> None:
+        """
+        Releases the grids and the mapped buffer if present
+        """
+
+        self._grids = {}
+        self._grid_offsets = None
+        self._pyramids = {}
+        self._area_index = None
+        self._reader = None
+        self._generation += 1
+
+        if self._buffer is None:
+            return
+
+        try:
+            self._buffer.close()
+        except BufferError:
+            self.notify.warning('Map buffer is still referenced; leaving it to be unmapped on release')
+
+        self._buffer = None
+
+    def parse(self, reader: reader.BinaryReader, zero_copy: bool = False, lazy: bool = False) -> None:
         """
         Parses the data contained in the map file
         """
 
+        position = reader.tell()
+        start = time.perf_counter()
+        grid_count = self.__read_preamble(reader)
+        self._stats.add_phase('header', time.perf_counter() - start)
+
+        if lazy:
+            # Indexing walks past the grids, only the header is decoded
+            start = time.perf_counter()
+            self._stats.add_bytes(reader.tell() - position)
+            if reader.in_memory:
+                self._grid_offsets = self.__scan_grids(reader.buf, reader.tell(), grid_count)
+            else:
+                self._grid_offsets = self.__index_grids(reader, grid_count)
+            self._stats.add_phase('index', time.perf_counter() - start)
+        else:
+            if self._regions is not None:
+                self.__parse_regions(reader, grid_count, zero_copy)
+            else:
+                self.__insert_grids(self.__read_grids(reader, grid_count, zero_copy))
+
+            self._stats.add_bytes(reader.tell() - position)
+
+        self.__finish_load()
+
+    def __insert_grids(self, file_grids) -> None:
+        """
+        Inserts the parsed grids into the grid table
+        """
+
+        add_phase = self._stats.add_phase
+        for file_grid in file_grids:
+            start = time.perf_counter()
+            index = file_grid.x << 16 | file_grid.y
+            if index in self._grids:
+                raise ValueError('Index already exists: %s' % index)
+
+            self._grids[index] = file_grid
+            self._generation += 1
+            add_phase('insert', time.perf_counter() - start)
+
+    def __finish_load(self) -> None:
+        """
+        Reports a completed load to the load callback if one is set
+        """
+
+        self._generation += 1
+        if self.load_callback is not None:
+            self.load_callback(self)
+
+        if self.notify.getDebug():
+            self.notify.debug('Load stats: %s' % self._stats.as_dict())
+
+    def parse_cache(self, buffer, verify: bool = True) -> None:
+        """
+        Parses a map cache from any object supporting the buffer protocol.
+        Raises a ValueError if the cache is stale or corrupt
+        """
+
+        start = time.perf_counter()
+        self._asset, file_grids, size = mapcache.parse_cache(buffer, (self.MAGIC, self.VERSION, self.BUILD), verify)
+        for file_grid in file_grids:
+            index = file_grid.x << 16 | file_grid.y
+            if index in self._grids:
+                raise ValueError('Index already exists: %s' % index)
+
+            self._grids[index] = file_grid
+            self._stats.add_grid(file_grid.get_cell_count())
+
+        self._stats.add_phase('cache', time.perf_counter() - start)
+        self._stats.add_bytes(size)
+        self.__finish_load()
+
+    def write_cache(self, filepath: str) -> None:
+        """
+        Writes the map as a cache of contiguous float32 height and uint32
+        area tiles per grid that read_cache can load without parsing
+        """
+
+        mapcache.write_cache(filepath, (self.MAGIC, self.VERSION, self.BUILD), self.__iter_cache_chunks())
+
+    def get_cache_chunks(self) -> list:
+        """
+        Returns the map cache written by write_cache as a list of byte
+        buffers, starting with the header
+        """
+
+        return mapcache.get_chunks((self.MAGIC, self.VERSION, self.BUILD), self.__iter_cache_chunks())
+
+    def __iter_cache_chunks(self):
+        """
+        Yields the map cache payload in chunks, loading one grid at a time
+        """
+
+        indices = [x << 16 | y for x, y in self.get_grid_coords()]
+        return mapcache.iter_chunks(self._asset, len(indices), (self.__load_grid(index) for index in indices))
+
+    def __parse_regions(self, reader: reader.BinaryReader, grid_count: int, zero_copy: bool) -> None:
+        """
+        Parses the grids and cells covered by the map's regions, seeking
+        past the rest while recording every grid's byte offset
+        """
+
+        self._region_offsets = {}
+        for grid_index in range(grid_count):
+            offset = reader.tell()
+            x, y = reader.read_struct('2I')
+            reader.seek(offset)
+
+            index = x << 16 | y
+            if index in self._region_offsets:
+                raise ValueError('Index already exists: %s' % index)
+
+            self._region_offsets[index] = offset
+            if self.__is_grid_covered(x, y):
+                start = time.perf_counter()
+                file_grid = self.__read_region_grid(reader, x, y, zero_copy)
+                self._stats.add_phase('parse', time.perf_counter() - start)
+                self._stats.add_grid(file_grid.get_cell_count())
+                self._grids[index] = file_grid
+            else:
+                grid.MapFileGrid.skip(reader)
+
+    def __read_region_grid(self, reader: reader.BinaryReader, x: int, y: int,
+                           zero_copy: bool = False) -> grid.MapFileGrid:
+        """
+        Parses the grid at the reader's position, skipping cells outside
+        of the map's regions
+        """
+
+        cells = constants.grid_cell_count
+        mask = cells - 1
+        base_x = x * cells
+        base_y = y * cells
+
+        file_grid = grid.MapFileGrid()
+        file_grid.read(reader, zero_copy,
+            lambda cell_x, cell_y: self.__is_cell_covered(base_x + (cell_x & mask), base_y + (cell_y & mask)),
+            self._layers)
+
+        return file_grid
+
+    def add_region(self, bounds: tuple) -> None:
+        """
+        Loads the grids and cells within the world space
+        (min_x, min_y, max_x, max_y) bounds
+        """
+
+        if self._regions is None:
+            raise ValueError('Map was not read with bounds')
+
+        rect = self.__get_cell_rect(bounds)
+        self._regions.append(rect)
+        self.__refresh_region(rect)
+
+    def remove_region(self, bounds: tuple) -> None:
+        """
+        Releases the grids and cells of a region previously supplied to
+        read or add_region that no other region covers
+        """
+
+        rect = self.__get_cell_rect(bounds) if self._regions is not None else None
+        if rect not in (self._regions or ()):
+            raise ValueError('Region is not loaded: %s' % (bounds,))
+
+        self._regions.remove(rect)
+        self.__refresh_region(rect)
+
+    def __refresh_region(self, rect: tuple) -> None:
+        """
+        Reloads the grids overlapping the global cell rectangle so they
+        match the current regions. Lazy grids are reloaded on next request
+        """
+
+        cells = constants.grid_cell_count
+        offsets = self._grid_offsets if self.lazy else self._region_offsets
+        affected = []
+        for index in offsets:
+            x = index >> 16
+            y = index & 0xFFFF
+            if x * cells <= rect[2] and rect[0] < (x + 1) * cells and y * cells <= rect[3] and rect[1] < (y + 1) * cells:
+                affected.append((index, x, y))
+
+        self._area_index = None
+        self._generation += 1
+        for index, x, y in affected:
+            self._grids.pop(index, None)
+            self._pyramids.pop(index, None)
+
+        if self.lazy:
+            return
+
+        with open(self._filepath, 'rb') as f:
+            bin_reader = reader.BinaryReader(f)
+            for index, x, y in affected:
+                if not self.__is_grid_covered(x, y):
+                    continue
+
+                bin_reader.seek(offsets[index])
+                self._grids[index] = self.__read_region_grid(bin_reader, x, y)
+
+    def __get_cell_rect(self, bounds: tuple) -> tuple:
+        """
+        Returns the inclusive global cell rectangle covering the world
+        space (min_x, min_y, max_x, max_y) bounds
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        size = constants.grid_cell_size
+        min_x = int(math.floor((bounds[0] + origin) / size))
+        min_y = int(math.floor((bounds[1] + origin) / size))
+        max_x = max(min_x, int(math.ceil((bounds[2] + origin) / size)) - 1)
+        max_y = max(min_y, int(math.ceil((bounds[3] + origin) / size)) - 1)
+
+        return (min_x, min_y, max_x, max_y)
+
+    def __is_grid_covered(self, x: int, y: int) -> bool:
+        """
+        Returns true if any region overlaps the grid
+        """
+
+        cells = constants.grid_cell_count
+        for min_x, min_y, max_x, max_y in self._regions:
+            if x * cells <= max_x and min_x < (x + 1) * cells and y * cells <= max_y and min_y < (y + 1) * cells:
+                return True
+
+        return False
+
+    def __is_cell_covered(self, cell_x: int, cell_y: int) -> bool:
+        """
+        Returns true if any region contains the global cell coordinate
+        """
+
+        for min_x, min_y, max_x, max_y in self._regions:
+            if min_x <= cell_x <= max_x and min_y <= cell_y <= max_y:
+                return True
+
+        return False
+
+    def __read_preamble(self, reader: reader.BinaryReader) -> int:
+        """
+        Reads the header and asset name, returning the grid count
+        """
+
         self.__read_header(reader)
         self._asset = reader.read_string()
-        
-        grid_count = reader.read_uint()
+
+        return reader.read_uint()
+
+    def __read_grids(self, reader: reader.BinaryReader, grid_count: int, zero_copy: bool = False):
+        """
+        Yields each grid as it is parsed from the reader
+        """
+
         for grid_index in range(grid_count):
+            start = time.perf_counter()
             file_grid = grid.MapFileGrid()
-            file_grid.read(reader)
+            file_grid.read(reader, zero_copy, layers=self._layers)
+            self._stats.add_phase('parse', time.perf_counter() - start)
+            self._stats.add_grid(file_grid.get_cell_count())
+            yield file_grid
 
-            index = file_grid.x << 16 | file_grid.y
-            if index in self._grids:
+    def __index_grids(self, reader: reader.BinaryReader, grid_count: int) -> dict:
+        """
+        Returns the byte offset of each grid without decoding it
+        """
+
+        grid_offsets = {}
+        for grid_index in range(grid_count):
+            offset = reader.tell()
+            x, y = grid.MapFileGrid.skip(reader)
+
+            index = x << 16 | y
+            if index in grid_offsets:
                 raise ValueError('Index already exists: %s' % index)
-            
-            self._grids[index] = file_grid
+
+            grid_offsets[index] = offset
+
+        return grid_offsets
+
+    def __scan_grids(self, buffer, offset: int, grid_count: int) -> dict:
+        """
+        Returns the byte offset of each grid by walking the cell headers of
+        the supplied buffer directly, without going through a reader
+        """
+
+        grid_offsets = {}
+        for grid_index in range(grid_count):
+            x, y, end = grid.MapFileGrid.scan(buffer, offset)
+
+            index = x << 16 | y
+            if index in grid_offsets:
+                raise ValueError('Index already exists: %s' % index)
+
+            grid_offsets[index] = offset
+            offset = end
+
+        return grid_offsets
+
+    def __scan_cells(self, reader: reader.BinaryReader, grid_count: int):
+        """
+        Yields each grid of the in-memory reader backed by an index of its
+        cell offsets, without reading any cells
+        """
+
+        buffer = reader.buf
+        offset = reader.tell()
+        for grid_index in range(grid_count):
+            start = time.perf_counter()
+            cell_offsets = array('Q', bytes(8 * grid.MapFileGrid.CELL_SLOTS))
+            x, y, offset = grid.MapFileGrid.scan(buffer, offset, cell_offsets)
+
+            file_grid = grid.MapFileGrid.from_offsets(x, y, reader, cell_offsets, self._layers)
+            self._stats.add_phase('index', time.perf_counter() - start)
+            self._stats.add_grid(file_grid.get_cell_count())
+            yield file_grid
+
+    def __load_grid(self, index: int) -> grid.MapFileGrid:
+        """
+        Returns the grid at the given index, parsing it on demand in lazy mode
+        """
+
+        if self._grid_offsets is None:
+            return self._grids.get(index, None)
+
+        file_grid = self._grids.get(index, None)
+        if file_grid is not None:
+            self._cache_hits += 1
+            self._grids.move_to_end(index)
+            return file_grid
+
+        offset = self._grid_offsets.get(index, None)
+        if offset is None:
+            return None
+
+        x = index >> 16
+        y = index & 0xFFFF
+        if self._regions is not None and not self.__is_grid_covered(x, y):
+            return None
+
+        self._cache_misses += 1
+        start = time.perf_counter()
+        self._reader.seek(offset)
+        if self._regions is not None:
+            file_grid = self.__read_region_grid(self._reader, x, y)
+        else:
+            file_grid = grid.MapFileGrid()
+            file_grid.read(self._reader, layers=self._layers)
+
+        self._stats.add_phase('load', time.perf_counter() - start)
+        self._stats.add_bytes(self._reader.tell() - offset)
+        self._stats.add_grid(file_grid.get_cell_count())
+
+        self._grids[index] = file_grid
+        if self._cache_size and len(self._grids) > self._cache_size:
+            self._grids.popitem(last=False)
+            self._cache_evictions += 1
+
+        return file_grid
+
+    def get_cache_stats(self) -> dict:
+        """
+        Returns the lazy grid cache counters
+        """
+
+        return {
+            'resident': len(self._grids),
+            'capacity': self._cache_size,
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'evictions': self._cache_evictions
+        }
+
+    def get_stats(self) -> dict:
+        """
+        Returns a json serializable snapshot of the map's load and lookup
+        stats along with its resident grid, cell and memory totals
+        """
+
+        snapshot = self._stats.as_dict()
+        snapshot['grids_resident'] = len(self._grids)
+        snapshot['cells_resident'] = sum(file_grid.get_cell_count() for file_grid in self._grids.values())
+        snapshot['memory_bytes'] = sum(file_grid.get_memory_size() for file_grid in self._grids.values())
+        if self.lazy:
+            snapshot['cache'] = self.get_cache_stats()
+
+        if self._height_cache is not None:
+            snapshot['height_cache'] = self._height_cache.get_stats()
+
+        return snapshot
 
     def __read_header(self, reader: reader.BinaryReader) -> None:
         """
@@ -101,6 +939,7 @@ class MapFile(object):
         assert version == self.VERSION
         assert build == self.BUILD
 
+    @instrumentation.timed_lookup('world_area_id')
     def get_world_area_id(self, vector: core.Vec2) -> int:
         """
         Return world area id at the supplied position
@@ -112,33 +951,522 @@ class MapFile(object):
 
         return grid.get_world_area_id(vector)
 
+    @instrumentation.timed_lookup('terrain_height')
     def get_terrain_height(self, vector: core.Vec2) -> float:
         """
         Returns the terrain height at the supplied position
         """
 
+        if self._height_cache is not None:
+            return self._height_cache.get_terrain_height(vector)
+
         grid = self.get_grid(vector)
         if not grid:
             return 0
 
         return grid.get_terrain_height(vector)
 
+    @instrumentation.timed_lookup('liquid_height')
+    def get_liquid_height(self, vector: core.Vec2) -> float:
+        """
+        Returns the liquid surface height at the supplied position, or
+        None if there is no liquid
+        """
+
+        grid = self.get_grid(vector)
+        if not grid:
+            return None
+
+        return grid.get_liquid_height(vector)
+
+    @instrumentation.timed_lookup('liquid_heights')
+    def get_liquid_heights(self, xs, ys) -> array:
+        """
+        Returns the liquid surface heights at the supplied coordinate
+        arrays as a float32 array. Points without liquid are NaN
+        """
+
+        heights = array('f', [math.nan]) * len(xs)
+        for cell, group in self.__group_points(xs, ys):
+            if len(cell.liquid_heightmap):
+                self.__interpolate_points(cell.liquid_heightmap, group, heights)
+
+        return heights
+
+    def get_height_cursor(self) -> heightcache.HeightCursor:
+        """
+        Returns a cursor that remembers the caller's last resolved cell.
+        Keep one cursor per caller, e.g. per NPC, for repeated nearby lookups
+        """
+
+        return heightcache.HeightCursor(self)
+
+    def enable_height_cache(self, size: int = heightcache.HeightCache.SIZE,
+                            resolution: float = heightcache.HeightCache.RESOLUTION) -> None:
+        """
+        Memoizes get_terrain_height in a bounded LRU keyed by position
+        quantized to the supplied resolution
+        """
+
+        self._height_cache = heightcache.HeightCache(self, size, resolution)
+
+    def disable_height_cache(self) -> None:
+        """
+        Drops the height cache, returning get_terrain_height to exact lookups
+        """
+
+        self._height_cache = None
+
+    def get_height_cache_stats(self) -> dict:
+        """
+        Returns the height cache's hit rate counters or None when disabled
+        """
+
+        if self._height_cache is None:
+            return None
+
+        return self._height_cache.get_stats()
+
+    @instrumentation.timed_lookup('terrain_heights')
+    def get_terrain_heights(self, xs, ys) -> array:
+        """
+        Returns the terrain heights at the supplied coordinate arrays as a
+        float32 array. Points are grouped by cell so each grid and cell is
+        resolved once per call. Points without terrain data return 0. Runs
+        vectorized when numpy is installed
+        """
+
+        if numpy is not None:
+            return self.__interpolate_arrays(xs, ys)
+
+        heights = array('f', bytes(4 * len(xs)))
+        for cell, group in self.__group_points(xs, ys):
+            if len(cell.heights):
+                self.__interpolate_points(cell.heights, group, heights)
+
+        return heights
+
+    @instrumentation.timed_lookup('terrain_normal')
+    def get_terrain_normal(self, vector: core.Vec2) -> core.Vec3:
+        """
+        Returns the terrain normal at the supplied position
+        """
+
+        cell = self.__get_normal_cell(vector)
+        if not cell:
+            return core.Vec3(0, 0, 1)
+
+        return cell.get_normal(vector.get_x(), vector.get_y())
+
+    @instrumentation.timed_lookup('slope')
+    def get_slope(self, vector: core.Vec2) -> float:
+        """
+        Returns the terrain slope in degrees from horizontal at the
+        supplied position
+        """
+
+        cell = self.__get_normal_cell(vector)
+        if not cell:
+            return 0.0
+
+        return cell.get_slope(vector.get_x(), vector.get_y())
+
+    @instrumentation.timed_lookup('terrain_normals')
+    def get_terrain_normals(self, xs, ys) -> array:
+        """
+        Returns the terrain normals at the supplied coordinate arrays as a
+        flat float32 array of (x, y, z) triples. Points without terrain
+        data face straight up
+        """
+
+        normals = array('f', [0.0, 0.0, 1.0]) * len(xs)
+        for cell, group in self.__group_points(xs, ys, normals=True):
+            get_vertex_normal = cell._get_vertex_normal
+            for i, vertex_x, vertex_y in group:
+                normals[i * 3:i * 3 + 3] = array('f', get_vertex_normal(vertex_x, vertex_y))
+
+        return normals
+
+    @instrumentation.timed_lookup('slopes')
+    def get_slopes(self, xs, ys) -> array:
+        """
+        Returns the terrain slopes in degrees at the supplied coordinate
+        arrays as a float32 array
+        """
+
+        slopes = array('f', bytes(4 * len(xs)))
+        degrees = math.degrees
+        acos = math.acos
+        for cell, group in self.__group_points(xs, ys, normals=True):
+            get_vertex_normal = cell._get_vertex_normal
+            for i, vertex_x, vertex_y in group:
+                slopes[i] = degrees(acos(min(1.0, get_vertex_normal(vertex_x, vertex_y)[2])))
+
+        return slopes
+
+    def __interpolate_points(self, heightmap, group: list, heights: array) -> None:
+        """
+        Interpolates a cell heightmap at each grouped vertex space point,
+        storing the results into heights by point index
+        """
+
+        floor = math.floor
+        row = constants.cell_vertex_count
+        for i, vertex_x, vertex_y in group:
+            floor_x = floor(vertex_x)
+            floor_y = floor(vertex_y)
+            sq_x = vertex_x - floor_x
+            sq_z = vertex_y - floor_y
+
+            index = (floor_x & 15) * row + (floor_y & 15)
+            p1 = heightmap[index + row]
+            p2 = heightmap[index + 1]
+            if (sq_x + sq_z) < 1:
+                p0 = heightmap[index]
+                heights[i] = p0 + (p1 - p0) * sq_x + (p2 - p0) * sq_z
+            else:
+                p3 = heightmap[index + row + 1]
+                heights[i] = p3 + (p1 - p3) * (1.0 - sq_z) + (p2 - p3) * (1.0 - sq_x)
+
+    def __interpolate_arrays(self, xs, ys) -> array:
+        """
+        Vectorized get_terrain_heights. Floors and bounds the whole point
+        arrays at once, gathers each point's vertices from a table of the
+        touched cells' heightmaps and picks its triangle with where
+        """
+
+        xs = numpy.asarray(xs, dtype=numpy.float64).ravel()
+        ys = numpy.asarray(ys, dtype=numpy.float64).ravel()
+        if len(xs) != len(ys):
+            raise ValueError('Coordinate arrays differ in length: %s, %s' % (len(xs), len(ys)))
+
+        scale = 1.0 / constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size * scale
+        limit = constants.world_grid_count * constants.grid_size // constants.cell_vertex_size
+        row = constants.cell_vertex_count
+
+        vertex_x = xs * scale + origin
+        vertex_y = ys * scale + origin
+        valid = (vertex_x >= 0) & (vertex_x < limit) & (vertex_y >= 0) & (vertex_y < limit)
+        vertex_x = numpy.where(valid, vertex_x, 0.0)
+        vertex_y = numpy.where(valid, vertex_y, 0.0)
+
+        floor_x = numpy.floor(vertex_x)
+        floor_y = numpy.floor(vertex_y)
+        sq_x = vertex_x - floor_x
+        sq_z = vertex_y - floor_y
+        floor_x = floor_x.astype(numpy.int64)
+        floor_y = floor_y.astype(numpy.int64)
+
+        # One table row per touched cell; row 0 stays zero for points
+        # outside the map or in cells without terrain
+        keys, slots = numpy.unique((floor_x >> 4 << 16 | floor_y >> 4)[valid], return_inverse=True)
+        table = numpy.zeros((len(keys) + 1, grid.MapFileCell.HEIGHTMAP_LENGTH), dtype=numpy.float64)
+        for table_row, key in enumerate(keys.tolist(), 1):
+            cell = self.__get_cell(key >> 16, key & 0xFFFF)
+            if cell is not None and len(cell.heights):
+                table[table_row] = numpy.frombuffer(cell.heights, dtype=numpy.float32)
+
+        rows = numpy.zeros(len(xs), dtype=numpy.intp)
+        rows[valid] = slots.ravel() + 1
+
+        # The upper triangle mirrors the lower one around p3
+        index = (floor_x & 15) * row + (floor_y & 15)
+        upper = (sq_x + sq_z) >= 1
+        base = table[rows, numpy.where(upper, index + row + 1, index)]
+        p1 = table[rows, index + row]
+        p2 = table[rows, index + 1]
+        weight_1 = numpy.where(upper, 1.0 - sq_z, sq_x)
+        weight_2 = numpy.where(upper, 1.0 - sq_x, sq_z)
+
+        heights = array('f')
+        heights.frombytes((base + (p1 - base) * weight_1 + (p2 - base) * weight_2).astype(numpy.float32).tobytes())
+
+        return heights
+
+    def __group_points(self, xs, ys, normals: bool = False):
+        """
+        Yields each present cell with the (index, vertex_x, vertex_y) of
+        the supplied points it contains, resolving each grid and cell once.
+        With normals set the cells' normals are built across their neighbours
+        """
+
+        xs = xs.tolist() if hasattr(xs, 'tolist') else xs
+        ys = ys.tolist() if hasattr(ys, 'tolist') else ys
+        if len(xs) != len(ys):
+            raise ValueError('Coordinate arrays differ in length: %s, %s' % (len(xs), len(ys)))
+
+        scale = 1.0 / constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size * scale
+        limit = constants.world_grid_count * constants.grid_size // constants.cell_vertex_size
+
+        # Bucket the points by their global cell coordinate
+        groups = {}
+        for i in range(len(xs)):
+            vertex_x = xs[i] * scale + origin
+            vertex_y = ys[i] * scale + origin
+            if not (0 <= vertex_x < limit and 0 <= vertex_y < limit):
+                continue
+
+            key = (int(vertex_x) >> 4, int(vertex_y) >> 4)
+            group = groups.get(key, None)
+            if group is None:
+                group = groups[key] = []
+
+            group.append((i, vertex_x, vertex_y))
+
+        for (cell_x, cell_y), group in groups.items():
+            cell = self.__get_cell(cell_x, cell_y)
+            if cell is None:
+                continue
+
+            if normals and not cell.has_normals:
+                self.__build_normals(cell, cell_x, cell_y)
+
+            yield (cell, group)
+
+    def __get_cell(self, cell_x: int, cell_y: int) -> grid.MapFileCell:
+        """
+        Returns the cell at the supplied global cell coordinate if present
+        """
+
+        file_grid = self.__load_grid(cell_x >> 4 << 16 | cell_y >> 4)
+        if file_grid is None:
+            return None
+
+        return file_grid.get_cell_slot((cell_y & 15) * constants.grid_cell_count + (cell_x & 15))
+
+    def __get_normal_cell(self, vector: core.Vec2) -> grid.MapFileCell:
+        """
+        Returns the cell containing the supplied position, building its
+        normals across its neighbours
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        cell_x = int(math.floor((vector.get_x() + origin) / constants.grid_cell_size))
+        cell_y = int(math.floor((vector.get_y() + origin) / constants.grid_cell_size))
+        limit = constants.world_grid_count * constants.grid_cell_count
+        if not (0 <= cell_x < limit and 0 <= cell_y < limit):
+            return None
+
+        cell = self.__get_cell(cell_x, cell_y)
+        if cell is not None and not cell.has_normals:
+            self.__build_normals(cell, cell_x, cell_y)
+
+        return cell
+
+    def __build_normals(self, cell: grid.MapFileCell, cell_x: int, cell_y: int) -> None:
+        """
+        Builds the normals of the cell at the supplied global cell
+        coordinate from the heights of its neighbours, across grid edges
+        """
+
+        get_cell = self.__get_cell
+        cell.build_normals(lambda offset_x, offset_y: get_cell(cell_x + offset_x, cell_y + offset_y))
+
+    def get_area_index(self) -> area.AreaIndex:
+        """
+        Returns the map's world area index, building it from every grid on
+        first use
+        """
+
+        if self._area_index is None:
+            area_index = area.AreaIndex()
+            for x, y in self.get_grid_coords():
+                area_index.add_grid(self.get_grid_exact(core.Vec2(x, y)))
+
+            self._area_index = area_index
+
+        return self._area_index
+
+    @instrumentation.timed_lookup('area_ids_in_radius')
+    def get_area_ids_in_radius(self, vector: core.Vec2, radius: float) -> set:
+        """
+        Returns every world area id within radius of the supplied position
+        """
+
+        return self.get_area_index().get_area_ids_in_radius(vector, radius)
+
+    def get_area_cells(self, area_id: int) -> list:
+        """
+        Returns every cell containing the supplied world area id
+        """
+
+        cells = constants.grid_cell_count
+        area_cells = []
+        for cell_x, cell_y in self.get_area_index().get_cell_coords(area_id):
+            file_grid = self.get_grid_exact(core.Vec2(cell_x // cells, cell_y // cells))
+            area_cells.append(file_grid.get_cell_slot((cell_y % cells) * cells + cell_x % cells))
+
+        return area_cells
+
+    def get_raycaster(self) -> raycast.TerrainRaycaster:
+        """
+        Returns the map's terrain raycaster, creating it on first use
+        """
+
+        if self._raycaster is None:
+            self._raycaster = raycast.TerrainRaycaster(self)
+
+        return self._raycaster
+
+    @instrumentation.timed_lookup('raycast')
+    def raycast(self, start: core.Point3, end: core.Point3) -> core.Point3:
+        """
+        Returns the first terrain intersection of the world space segment,
+        or None. Positions are (x, y, height)
+        """
+
+        return self.get_raycaster().raycast(start, end)
+
+    @instrumentation.timed_lookup('raycast_batch')
+    def raycast_batch(self, starts: list, ends: list) -> list:
+        """
+        Returns the first terrain intersection, or None, of each segment
+        """
+
+        return self.get_raycaster().raycast_batch(starts, ends)
+
+    @instrumentation.timed_lookup('line_of_sight')
+    def has_line_of_sight(self, start: core.Point3, end: core.Point3) -> bool:
+        """
+        Returns true if the terrain does not block the segment
+        """
+
+        return self.get_raycaster().get_hit_fraction(start, end) is None
+
+    @instrumentation.timed_lookup('line_of_sight_batch')
+    def has_line_of_sight_batch(self, starts: list, ends: list) -> list:
+        """
+        Returns for each segment whether the terrain does not block it
+        """
+
+        get_hit_fraction = self.get_raycaster().get_hit_fraction
+        return [get_hit_fraction(start, end) is None for start, end in zip(starts, ends)]
+
+    def get_collider(self) -> collision.TerrainCollider:
+        """
+        Returns the map's collider, which builds and caches per grid
+        collision nodes on first request
+        """
+
+        if self._collider is None:
+            self._collider = collision.TerrainCollider(self)
+
+        return self._collider
+
+    def get_collision_node(self, vector: core.Vec2) -> core.PandaNode:
+        """
+        Returns the collision node of the grid at the supplied position
+        """
+
+        return self.get_collider().get_node_at(vector)
+
+    def get_heightfield(self, min_grid: tuple = None, max_grid: tuple = None,
+                        nodata: float = heightfield.Heightfield.NODATA) -> heightfield.Heightfield:
+        """
+        Assembles the map, or the inclusive grid coordinate rectangle, into
+        a single contiguous heightfield
+        """
+
+        return heightfield.Heightfield.from_map(self, min_grid, max_grid, nodata)
+
+    def build_height_pyramids(self, base_level: int = pyramid.HeightPyramid.BASE_LEVEL) -> None:
+        """
+        Builds and caches the height pyramid of every grid in the map
+        """
+
+        self._pyramids = {}
+        self._pyramid_level = base_level
+        for x, y in self.get_grid_coords():
+            self.get_height_pyramid(self.get_grid_exact(core.Vec2(x, y)))
+
+    def get_height_pyramid(self, file_grid: grid.MapFileGrid) -> pyramid.HeightPyramid:
+        """
+        Returns the grid's height pyramid, building and caching it alongside
+        the map on first use. Pyramids outlive lazy grid eviction
+        """
+
+        index = file_grid.x << 16 | file_grid.y
+        height_pyramid = self._pyramids.get(index, None)
+        if height_pyramid is None:
+            height_pyramid = pyramid.HeightPyramid(file_grid, self._pyramid_level)
+            self._pyramids[index] = height_pyramid
+
+        return height_pyramid
+
+    def get_height_bounds(self, vector: core.Vec2, level: int = pyramid.HeightPyramid.CELL_LEVEL) -> (float, float):
+        """
+        Returns the min and max terrain height of the pyramid tile
+        containing the supplied position, or None if there is no grid
+        """
+
+        height_pyramid = self.__get_position_pyramid(vector)
+        if not height_pyramid:
+            return None
+
+        x, y = height_pyramid.get_tile_coord(level, vector)
+        return height_pyramid.get_bounds(level, x, y)
+
+    def get_coarse_height(self, vector: core.Vec2, level: int) -> float:
+        """
+        Returns the average terrain height of the pyramid tile containing
+        the supplied position
+        """
+
+        height_pyramid = self.__get_position_pyramid(vector)
+        if not height_pyramid:
+            return 0
+
+        x, y = height_pyramid.get_tile_coord(level, vector)
+        return height_pyramid.get_average(level, x, y)
+
+    def __get_position_pyramid(self, vector: core.Vec2) -> pyramid.HeightPyramid:
+        """
+        Returns the cached pyramid of the grid at the supplied position
+        """
+
+        gridx, gridy = self.__get_grid_coord(vector)
+        height_pyramid = self._pyramids.get(gridx << 16 | gridy, None)
+        if height_pyramid is not None:
+            return height_pyramid
+
+        file_grid = self.get_grid(vector)
+        if not file_grid:
+            return None
+
+        return self.get_height_pyramid(file_grid)
+
+    def get_grid_coords(self) -> list:
+        """
+        Returns the (x, y) coordinate of every grid in the map, including
+        grids that are not resident in lazy mode. Grids outside of every
+        region are excluded when the map was read with bounds
+        """
+
+        indices = self._grid_offsets if self.lazy else self._grids
+        coords = [(index >> 16, index & 0xFFFF) for index in indices]
+        if self._regions is not None:
+            coords = [(x, y) for x, y in coords if self.__is_grid_covered(x, y)]
+
+        return coords
+
     def get_grid(self, vector: core.Vec2) -> grid.MapFileGrid:
         """
         Returns the grid at the given position
         """
 
         gridx, gridy = self.__get_grid_coord(vector)
-        index = gridy << 16 | gridx
-        return self._grids.get(index, None)
+        index = gridx << 16 | gridy
+        return self.__load_grid(index)
 
     def get_grid_exact(self, vector: core.Vec2) -> grid.MapFileGrid:
         """
         Returns the grid at the exact grid coordinate specified
         """
 
-        index = int(vector.get_y()) << 16 | int(vector.get_x())
-        return self._grids.get(index, None)        
+        index = int(vector.get_x()) << 16 | int(vector.get_y())
+        return self.__load_grid(index)
 
     def __get_grid_coord(self, vector: core.Vec2) -> (float, float):
         """
@@ -146,14 +1474,14 @@ class MapFile(object):
         """
 
         x = int(math.floor(
-            constants.grid_cell_count * constants.world_grid_origin + vector.get_x() / constants.grid_size))
+            constants.world_grid_origin + vector.get_x() / constants.grid_size))
 
-        if x < 0 or x > constants.world_grid_count * constants.grid_cell_count:
+        if x < 0 or x >= constants.world_grid_count:
             self.notify.error('Position X: %s is invalid' % x)
 
         y = int(math.floor(
-            constants.grid_cell_count * constants.world_grid_origin + vector.get_y() / constants.grid_size))
-        if y < 0 or y > constants.world_grid_count * constants.grid_cell_count:
+            constants.world_grid_origin + vector.get_y() / constants.grid_size))
+        if y < 0 or y >= constants.world_grid_count:
             self.notify.error('Position Y: %s is invalid' % y)
 
         return (x, y)
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+import struct
+import sys
+import zlib
+
+from . import grid
+
+notify = directNotify.newCategory('map-cache')
+
+MAGIC = 1129137742
+VERSION = 2
+
+# Cache magic, map magic, version and build, cache version, crc32 and payload size
+HEADER = struct.Struct('<6IQ')
+
+# Typecode of the flags, height, area, aura and liquid tiles of a cached grid
+TILE_TYPECODES = 'IfIIf'
+
+def get_tile_sizes() -> tuple:
+    """
+    Returns the byte size of the flags, height, area, aura and liquid
+    tiles of a cached grid
+    """
+
+    slots = grid.MapFileGrid.CELL_SLOTS
+    return (
+        slots * 4,
+        slots * grid.MapFileCell.HEIGHTMAP_LENGTH * 4,
+        slots * grid.MapFileCell.AREA_COUNT * 4,
+        slots * grid.MapFileCell.AURA_COUNT * 4,
+        slots * grid.MapFileCell.HEIGHTMAP_LENGTH * 4)
+
+def parse_cache(buffer, header: tuple, verify: bool = True) -> (str, list, int):
+    """
+    Parses a map cache from any object supporting the buffer protocol,
+    built for the supplied (magic, version, build) map header. Returns the
+    asset name, the tile backed grids and the cache size in bytes. Raises
+    a ValueError if the cache is stale or corrupt
+    """
+
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError('Map cache is truncated')
+
+    cache_magic, magic, version, build, cache_version, checksum, payload_size = HEADER.unpack_from(view, 0)
+    if cache_magic != MAGIC or cache_version != VERSION:
+        raise ValueError('Not a supported map cache')
+
+    if (magic, version, build) != tuple(header):
+        raise ValueError('Map cache was built for %s.%s.%s' % (magic, version, build))
+
+    payload = view[HEADER.size:HEADER.size + payload_size]
+    if len(payload) != payload_size:
+        raise ValueError('Map cache is truncated')
+
+    if verify and zlib.crc32(payload) != checksum:
+        raise ValueError('Map cache checksum mismatch')
+
+    asset_size, = struct.unpack_from('<I', payload, 0)
+    asset = bytes(payload[4:4 + asset_size]).decode('utf-8')
+    offset = (4 + asset_size + 3) & -4
+
+    grid_count, = struct.unpack_from('<I', payload, offset)
+    offset += 4
+
+    file_grids = []
+    tile_sizes = get_tile_sizes()
+    for grid_index in range(grid_count):
+        x, y, optional = struct.unpack_from('<3I', payload, offset)
+        offset += 12
+
+        # Aura and liquid tiles are only stored when the grid has them
+        tiles = []
+        for tile_index, (typecode, size) in enumerate(zip(TILE_TYPECODES, tile_sizes)):
+            if tile_index >= 3 and not optional & 1 << tile_index:
+                tiles.append(None)
+                continue
+
+            tile = payload[offset:offset + size].cast(typecode)
+            if sys.byteorder != 'little':
+                tile = array(typecode, tile)
+                tile.byteswap()
+
+            tiles.append(tile)
+            offset += size
+
+        file_grids.append(grid.MapFileGrid.from_tiles(x, y, *tiles))
+
+    return (asset, file_grids, HEADER.size + payload_size)
+
+def iter_chunks(asset: str, grid_count: int, file_grids):
+    """
+    Yields the map cache payload of the supplied grids in chunks, one grid
+    tile at a time
+    """
+
+    asset = (asset or '').encode('utf-8')
+    yield struct.pack('<I', len(asset)) + asset + bytes(-len(asset) & 3)
+    yield struct.pack('<I', grid_count)
+
+    for file_grid in file_grids:
+        tiles = file_grid.get_tiles()
+        optional = sum(1 << tile_index for tile_index in (3, 4) if tiles[tile_index] is not None)
+        yield struct.pack('<3I', file_grid.x, file_grid.y, optional)
+
+        for tile, typecode in zip(tiles, TILE_TYPECODES):
+            if tile is None:
+                continue
+
+            if sys.byteorder != 'little':
+                tile = array(typecode, tile)
+                tile.byteswap()
+
+            yield tile
+
+def pack_header(header: tuple, checksum: int, payload_size: int) -> bytes:
+    """
+    Returns the cache header for a payload built for the supplied
+    (magic, version, build) map header
+    """
+
+    magic, version, build = header
+    return HEADER.pack(MAGIC, magic, version, build, VERSION, checksum, payload_size)
+
+def get_chunks(header: tuple, chunks) -> list:
+    """
+    Returns the map cache of the supplied payload chunks as a list of byte
+    buffers, starting with the header
+    """
+
+    chunks = [memoryview(chunk).cast('B') for chunk in chunks]
+    checksum = 0
+    for chunk in chunks:
+        checksum = zlib.crc32(chunk, checksum)
+
+    return [memoryview(pack_header(header, checksum, sum(len(chunk) for chunk in chunks)))] + chunks
+
+def write_cache(filepath: str, header: tuple, chunks) -> None:
+    """
+    Writes the map cache of the supplied payload chunks to disk
+    """
+
+    notify.info('Writing map cache: %s' % filepath)
+
+    with open(filepath, 'wb') as f:
+        f.write(bytes(HEADER.size))
+
+        checksum = 0
+        payload_size = 0
+        for chunk in chunks:
+            chunk = memoryview(chunk).cast('B')
+            checksum = zlib.crc32(chunk, checksum)
+            payload_size += len(chunk)
+            f.write(chunk.tobytes())
+
+        f.seek(0)
+        f.write(pack_header(header, checksum, payload_size))
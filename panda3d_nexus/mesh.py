@@ -0,0 +1,187 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+from operator import mul, sub, truediv
+import math
+
+from . import grid, heightfield, constants
+
+class TerrainMesh(object):
+    """
+    Builds Panda3D terrain meshes from map grids. Vertices are shared
+    between cells and quads are split the same way MapFileCell.get_height
+    interpolates them
+    """
+
+    notify = directNotify.newCategory('mesh')
+
+    @classmethod
+    def build(cls, file_grid: grid.MapFileGrid, min_cell: tuple = (0, 0), max_cell: tuple = None,
+              name: str = None) -> core.GeomNode:
+        """
+        Builds a GeomNode for the grid, or the inclusive cell rectangle of
+        it. Vertices are placed at world (x, y, height)
+        """
+
+        mask = constants.grid_cell_count - 1
+        if max_cell is None:
+            max_cell = (mask, mask)
+
+        quads = constants.cell_vertex_count - 1
+        width = (max_cell[0] - min_cell[0] + 1) * quads + 1
+        height = (max_cell[1] - min_cell[1] + 1) * quads + 1
+
+        field = heightfield.Heightfield.from_grid(file_grid)
+        heights = cls.__get_heights(field, min_cell[0] * quads, min_cell[1] * quads, width, height)
+
+        origin_x = field.origin[0] + min_cell[0] * constants.grid_cell_size
+        origin_y = field.origin[1] + min_cell[1] * constants.grid_cell_size
+        vertices = cls.__get_vertices(heights, width, height, origin_x, origin_y)
+        indices = cls.__get_indices(file_grid, min_cell, max_cell, width)
+
+        if name is None:
+            name = 'grid-%s-%s' % (file_grid.x, file_grid.y)
+
+        vdata = core.GeomVertexData(name, core.GeomVertexFormat.get_v3n3(), core.Geom.UH_static)
+        vdata.unclean_set_num_rows(width * height)
+        memoryview(vdata.modify_array(0)).cast('B').cast('f')[:] = memoryview(vertices)
+
+        triangles = core.GeomTriangles(core.Geom.UH_static)
+        triangles.set_index_type(core.GeomEnums.NT_uint32)
+        index_data = triangles.modify_vertices()
+        index_data.unclean_set_num_rows(len(indices))
+        memoryview(index_data).cast('B').cast('I')[:] = memoryview(indices)
+
+        geom = core.Geom(vdata)
+        geom.add_primitive(triangles)
+
+        node = core.GeomNode(name)
+        node.add_geom(geom)
+
+        if cls.notify.getDebug():
+            cls.notify.debug('Built %s vertices and %s triangles' % (width * height, len(indices) // 3))
+
+        return node
+
+    @classmethod
+    def __get_heights(cls, field: heightfield.Heightfield, x: int, y: int, width: int, height: int) -> array:
+        """
+        Returns the vertex rectangle of the heightfield with nodata zeroed
+        """
+
+        heights = array('f')
+        for row in range(y, y + height):
+            offset = row * field.width + x
+            heights.extend(field.data[offset:offset + width])
+
+        nodata = field.nodata
+        if nodata in heights:
+            heights = array('f', [0.0 if value == nodata else value for value in heights])
+
+        return heights
+
+    @classmethod
+    def __get_vertices(cls, heights: array, width: int, height: int, origin_x: float, origin_y: float) -> array:
+        """
+        Returns the interleaved position and normal vertex buffer. Normals
+        come from central differences clamped at the edges
+        """
+
+        spacing = constants.cell_vertex_size
+        count = width * height
+
+        positions_x = array('f', [origin_x + x * spacing for x in range(width)]) * height
+        positions_y = array('f')
+        for y in range(height):
+            positions_y.extend(array('f', [origin_y + y * spacing]) * width)
+
+        # Differences along x within each row, along y between rows
+        slopes_x = array('f')
+        slopes_y = array('f')
+        for y in range(height):
+            current = heights[y * width:(y + 1) * width]
+            padded = current[:1] + current + current[-1:]
+            slopes_x.extend(array('f', map(sub, padded[2:], padded[:-2])))
+
+            previous = heights[max(y - 1, 0) * width:max(y - 1, 0) * width + width]
+            following = heights[min(y + 1, height - 1) * width:min(y + 1, height - 1) * width + width]
+            slopes_y.extend(array('f', map(sub, following, previous)))
+
+        scale = [-0.5 / spacing] * count
+        slopes_x = list(map(mul, slopes_x, scale))
+        slopes_y = list(map(mul, slopes_y, scale))
+        lengths = list(map(math.hypot, slopes_x, slopes_y, [1.0] * count))
+
+        vertices = array('f', bytes(4 * 6 * count))
+        view = memoryview(vertices)
+        view[0::6] = memoryview(positions_x)
+        view[1::6] = memoryview(positions_y)
+        view[2::6] = memoryview(heights)
+        view[3::6] = memoryview(array('f', map(truediv, slopes_x, lengths)))
+        view[4::6] = memoryview(array('f', map(truediv, slopes_y, lengths)))
+        view[5::6] = memoryview(array('f', map(truediv, [1.0] * count, lengths)))
+
+        return vertices
+
+    @classmethod
+    def __get_indices(cls, file_grid: grid.MapFileGrid, min_cell: tuple, max_cell: tuple, width: int) -> array:
+        """
+        Returns the triangle index buffer for the present cells. Each quad
+        is split along the diagonal from (x + 1, y) to (x, y + 1)
+        """
+
+        quads = constants.cell_vertex_count - 1
+        indices = array('I')
+        for cell_y in range(min_cell[1], max_cell[1] + 1):
+
+            # Group the row's consecutive present cells into runs of quads
+            runs = []
+            for cell_x in range(min_cell[0], max_cell[0] + 1):
+                cell = file_grid.get_cell_slot(cell_y * constants.grid_cell_count + cell_x)
+                if cell is None or not len(cell.heights):
+                    continue
+
+                first = (cell_x - min_cell[0]) * quads
+                if runs and runs[-1][1] == first:
+                    runs[-1][1] = first + quads
+                else:
+                    runs.append([first, first + quads])
+
+            for y in range(quads):
+                row = ((cell_y - min_cell[1]) * quads + y) * width
+                for first, last in runs:
+                    run = array('I', bytes(4 * 6 * (last - first)))
+                    view = memoryview(run)
+                    for corner, offset in enumerate((0, 1, width, 1, width + 1, width)):
+                        view[corner::6] = memoryview(array('I', range(row + first + offset, row + last + offset)))
+
+                    indices.extend(run)
+
+        return indices
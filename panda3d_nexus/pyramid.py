@@ -0,0 +1,202 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from array import array
+from operator import add
+import math
+
+from . import grid, constants
+
+class HeightPyramid(object):
+    """
+    Min, max and average height mip levels for a grid. Level 0 holds one
+    tile per vertex quad, CELL_LEVEL one tile per cell and GRID_LEVEL a
+    single tile for the whole grid. Tiles are stored row-major, indexed by
+    y * size + x. Tiles without terrain have an infinite empty range and
+    a NaN average
+    """
+
+    notify = directNotify.newCategory('pyramid')
+
+    CELL_LEVEL = int(math.log2(constants.cell_vertex_count - 1))
+    GRID_LEVEL = CELL_LEVEL + int(math.log2(constants.grid_cell_count))
+    BASE_LEVEL = 2
+
+    def __init__(self, file_grid: grid.MapFileGrid, base_level: int = BASE_LEVEL):
+        self._x = file_grid.x
+        self._y = file_grid.y
+        self._base_level = min(max(base_level, 0), self.GRID_LEVEL)
+        self._levels = [None] * (self.GRID_LEVEL + 1)
+
+        self.__build(file_grid)
+
+    @property
+    def x(self) -> int:
+        return self._x
+
+    @property
+    def y(self) -> int:
+        return self._y
+
+    @property
+    def base_level(self) -> int:
+        return self._base_level
+
+    def get_size(self, level: int) -> int:
+        """
+        Returns the number of tiles along each side of the supplied level
+        """
+
+        return 1 << (self.GRID_LEVEL - level)
+
+    def get_level(self, level: int) -> tuple:
+        """
+        Returns the (mins, maxs, averages) float32 tile arrays of the level
+        """
+
+        if level < self._base_level or level > self.GRID_LEVEL:
+            raise ValueError('Level %s is not in the pyramid' % level)
+
+        return self._levels[level]
+
+    def get_bounds(self, level: int, x: int, y: int) -> (float, float):
+        """
+        Returns the min and max height of the supplied tile
+        """
+
+        mins, maxs, averages = self.get_level(level)
+        index = y * self.get_size(level) + x
+
+        return (mins[index], maxs[index])
+
+    def get_average(self, level: int, x: int, y: int) -> float:
+        """
+        Returns the average height of the supplied tile
+        """
+
+        mins, maxs, averages = self.get_level(level)
+        return averages[y * self.get_size(level) + x]
+
+    def get_tile_coord(self, level: int, vector: core.Vec2) -> (int, int):
+        """
+        Returns the grid-local tile coordinate containing the world position
+        """
+
+        quad_size = constants.cell_vertex_size << level
+        origin = constants.world_grid_origin * constants.grid_size
+        mask = self.get_size(level) - 1
+
+        x = int(math.floor((vector.get_x() + origin) / quad_size)) & mask
+        y = int(math.floor((vector.get_y() + origin) / quad_size)) & mask
+
+        return (x, y)
+
+    def __build(self, file_grid: grid.MapFileGrid) -> None:
+        """
+        Reduces the grid's cell heightmaps into the pyramid levels
+        """
+
+        # Tiles up to a cell are built straight from the vertex runs of
+        # each cell, coarser levels are reduced from their children
+        start = min(self._base_level, self.CELL_LEVEL)
+        size = self.get_size(start)
+        step = 1 << start
+
+        inf = float('inf')
+        mins = array('f', [inf]) * (size * size)
+        maxs = array('f', [-inf]) * (size * size)
+        sums = array('f', bytes(4 * size * size))
+        counts = array('f', bytes(4 * size * size))
+
+        row = constants.cell_vertex_count
+        tiles = (row - 1) >> start
+        for slot in range(grid.MapFileGrid.CELL_SLOTS):
+            cell = file_grid.get_cell_slot(slot)
+            if cell is None or not len(cell.heights):
+                continue
+
+            heightmap = cell.heights
+            cell_x = (slot % constants.grid_cell_count) * tiles
+            cell_y = (slot // constants.grid_cell_count) * tiles
+
+            for i in range(tiles):
+                for j in range(tiles):
+                    low = inf
+                    high = -inf
+                    total = 0.0
+
+                    # Weigh each vertex by the number of tile quads it touches
+                    for x in range(i * step, i * step + step + 1):
+                        offset = x * row + j * step
+                        run = heightmap[offset:offset + step + 1]
+                        low = min(low, min(run))
+                        high = max(high, max(run))
+
+                        weighted = 2.0 * sum(run) - run[0] - run[-1]
+                        total += weighted if x in (i * step, i * step + step) else 2.0 * weighted
+
+                    index = (cell_y + j) * size + cell_x + i
+                    mins[index] = low
+                    maxs[index] = high
+                    sums[index] = total * 0.25
+                    counts[index] = step * step
+
+        level_data = (mins, maxs, sums, counts)
+        for level in range(start, self.GRID_LEVEL + 1):
+            if level >= self._base_level:
+                self._levels[level] = self.__get_level_tiles(*level_data)
+
+            if level < self.GRID_LEVEL:
+                level_data = self.__reduce(self.get_size(level), *level_data)
+
+    def __reduce(self, size: int, mins: array, maxs: array, sums: array, counts: array) -> tuple:
+        """
+        Combines each 2x2 block of tiles into a tile of the next level
+        """
+
+        reduced = []
+        for values, combine in zip((mins, maxs, sums, counts), (min, max, add, add)):
+            target = array('f')
+            for y in range(0, size, 2):
+                pair = list(map(combine, values[y * size:(y + 1) * size], values[(y + 1) * size:(y + 2) * size]))
+                target.extend(map(combine, pair[0::2], pair[1::2]))
+
+            reduced.append(target)
+
+        return tuple(reduced)
+
+    def __get_level_tiles(self, mins: array, maxs: array, sums: array, counts: array) -> tuple:
+        """
+        Returns the stored (mins, maxs, averages) tiles of a level
+        """
+
+        nan = float('nan')
+        averages = array('f', [total / count if count else nan for total, count in zip(sums, counts)])
+
+        return (array('f', mins), array('f', maxs), averages)
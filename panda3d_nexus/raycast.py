@@ -0,0 +1,217 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from panda3d import core
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+import math
+import weakref
+
+from . import grid, pyramid, constants
+
+class TerrainRaycaster(object):
+    """
+    Intersects segments with the map's terrain surface. Segments are walked
+    cell by cell with a DDA over the cell lattice, rejecting cells whose
+    height range the segment does not cross, and then quad by quad over
+    the 2-unit vertex lattice, testing the two triangles of each quad that
+    MapFileCell.get_height interpolates. Positions are world (x, y, height)
+    """
+
+    notify = directNotify.newCategory('raycast')
+
+    def __init__(self, map_file):
+        # A proxy so the map owning the raycaster is still freed by refcount
+        self._map_file = weakref.proxy(map_file)
+
+    def raycast(self, start, end) -> core.Point3:
+        """
+        Returns the first terrain intersection along the segment, or None
+        """
+
+        fraction = self.get_hit_fraction(start, end)
+        if fraction is None:
+            return None
+
+        return core.Point3(
+            start[0] + (end[0] - start[0]) * fraction,
+            start[1] + (end[1] - start[1]) * fraction,
+            start[2] + (end[2] - start[2]) * fraction)
+
+    def raycast_batch(self, starts: list, ends: list) -> list:
+        """
+        Returns the first terrain intersection, or None, of each segment
+        """
+
+        return [self.raycast(start, end) for start, end in zip(starts, ends)]
+
+    def get_hit_fraction(self, start, end) -> float:
+        """
+        Returns the fraction along the segment of its first terrain
+        intersection, or None. A start below the terrain hits at 0
+        """
+
+        scale = 1.0 / constants.cell_vertex_size
+        origin = constants.world_grid_origin * constants.grid_size * scale
+
+        u0 = start[0] * scale + origin
+        v0 = start[1] * scale + origin
+        z0 = start[2]
+        du = end[0] * scale + origin - u0
+        dv = end[1] * scale + origin - v0
+        dz = end[2] - z0
+
+        cell_vertices = constants.cell_vertex_count - 1
+        for cell_x, cell_y, t0, t1 in self.__traverse(u0, v0, du, dv, cell_vertices, 0.0, 1.0):
+            cell, bounds = self.__get_cell(cell_x, cell_y)
+            if cell is None:
+                continue
+
+            z_enter = z0 + dz * t0
+            z_exit = z0 + dz * t1
+            if min(z_enter, z_exit) > bounds[1]:
+                continue
+
+            if max(z_enter, z_exit) < bounds[0]:
+                return t0
+
+            fraction = self.__intersect_cell(cell, cell_x, cell_y, u0, v0, z0, du, dv, dz, t0, t1)
+            if fraction is not None:
+                return fraction
+
+        return None
+
+    def __get_cell(self, cell_x: int, cell_y: int) -> tuple:
+        """
+        Returns the cell at the global cell coordinate and its height range
+        """
+
+        cells = constants.grid_cell_count
+        limit = constants.world_grid_count * cells
+        if cell_x < 0 or cell_y < 0 or cell_x >= limit or cell_y >= limit:
+            return (None, None)
+
+        file_grid = self._map_file.get_grid_exact(core.Vec2(cell_x // cells, cell_y // cells))
+        if file_grid is None:
+            return (None, None)
+
+        cell = file_grid.get_cell_slot((cell_y % cells) * cells + cell_x % cells)
+        if cell is None or not len(cell.heights):
+            return (None, None)
+
+        height_pyramid = self._map_file.get_height_pyramid(file_grid)
+        if height_pyramid.base_level > pyramid.HeightPyramid.CELL_LEVEL:
+            return (cell, (min(cell.heights), max(cell.heights)))
+
+        return (cell, height_pyramid.get_bounds(pyramid.HeightPyramid.CELL_LEVEL, cell_x % cells, cell_y % cells))
+
+    def __intersect_cell(self, cell: grid.MapFileCell, cell_x: int, cell_y: int, u0: float, v0: float, z0: float,
+                         du: float, dv: float, dz: float, t0: float, t1: float) -> float:
+        """
+        Returns the first intersection fraction with the cell's triangles
+        within [t0, t1], or None
+        """
+
+        heightmap = cell.heights
+        row = constants.cell_vertex_count
+        quads = row - 1
+        for quad_x, quad_y, ta, tb in self.__traverse(u0, v0, du, dv, 1, t0, t1):
+            local_x = quad_x - cell_x * quads
+            local_y = quad_y - cell_y * quads
+            if not (0 <= local_x < quads and 0 <= local_y < quads):
+                continue
+
+            index = local_x * row + local_y
+            p0 = heightmap[index]
+            p1 = heightmap[index + row]
+            p2 = heightmap[index + 1]
+            p3 = heightmap[index + row + 1]
+
+            # Split the quad span where it crosses the triangle diagonal
+            base = u0 - quad_x + v0 - quad_y
+            spans = [ta, tb]
+            if du + dv != 0:
+                diagonal = (1.0 - base) / (du + dv)
+                if ta < diagonal < tb:
+                    spans = [ta, diagonal, tb]
+
+            for a, b in zip(spans, spans[1:]):
+                middle = (a + b) * 0.5
+                lower = base + (du + dv) * middle < 1
+
+                heights = []
+                for t in (a, b):
+                    sq_x = u0 + du * t - quad_x
+                    sq_z = v0 + dv * t - quad_y
+                    if lower:
+                        height = p0 + (p1 - p0) * sq_x + (p2 - p0) * sq_z
+                    else:
+                        height = p3 + (p1 - p3) * (1.0 - sq_z) + (p2 - p3) * (1.0 - sq_x)
+
+                    heights.append(z0 + dz * t - height)
+
+                if heights[0] <= 0:
+                    return a
+
+                if heights[1] <= 0:
+                    return a + (b - a) * heights[0] / (heights[0] - heights[1])
+
+        return None
+
+    def __traverse(self, u0: float, v0: float, du: float, dv: float, size: int, t0: float, t1: float):
+        """
+        Yields (x, y, t_enter, t_exit) for each lattice square of the
+        supplied size that the segment crosses between t0 and t1
+        """
+
+        x = int(math.floor((u0 + du * t0) / size))
+        y = int(math.floor((v0 + dv * t0) / size))
+
+        inf = float('inf')
+        step_x = 1 if du > 0 else -1
+        step_y = 1 if dv > 0 else -1
+        next_x = ((x + (du > 0)) * size - u0) / du if du else inf
+        next_y = ((y + (dv > 0)) * size - v0) / dv if dv else inf
+        delta_x = size / abs(du) if du else inf
+        delta_y = size / abs(dv) if dv else inf
+
+        t = t0
+        while True:
+            exit_t = min(next_x, next_y, t1)
+            if exit_t > t or t == t1:
+                yield (x, y, t, exit_t)
+
+            if exit_t >= t1:
+                return
+
+            if next_x < next_y:
+                x += step_x
+                next_x += delta_x
+            else:
+                y += step_y
+                next_y += delta_y
+
+            t = exit_t
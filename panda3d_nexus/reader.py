@@ -1,83 +1,224 @@
+import mmap
 import struct
-from os import SEEK_CUR
+import sys
+from array import array
+from os import SEEK_SET, SEEK_CUR, SEEK_END
 from typing import BinaryIO
 
 ENDIAN_PREFIXES = ("@", "<", ">", "=", "!")
+NATIVE_ENDIANS = ("@", "=", "<") if sys.byteorder == "little" else ("@", "=", ">", "!")
+MEMORY_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+_structs = {}
+
+
+def get_struct(format: str) -> struct.Struct:
+	"""
+	Returns a cached precompiled Struct for the supplied format
+	"""
+
+	compiled = _structs.get(format)
+	if compiled is None:
+		compiled = _structs[format] = struct.Struct(format)
+
+	return compiled
 
 
 class BinaryReader(object):
 	"""
-	Binary buffer for performing IO file operations
+	Binary buffer for performing IO file operations. Reads from a file
+	object, or from an in-memory bytes, memoryview or mmap buffer through
+	an offset cursor
 	"""
 
 	def __init__(self, buf: BinaryIO, endian: str = "<") -> None:
 		self.buf = buf
 		self.endian = endian
 
+		self._data = None
+		self._offset = 0
+		if isinstance(buf, MEMORY_TYPES):
+			self._data = memoryview(buf).cast("B")
+
+	@property
+	def endian(self) -> str:
+		return self._endian
+
+	@endian.setter
+	def endian(self, endian: str) -> None:
+		self._endian = endian
+		self._byte = get_struct(endian + "b")
+		self._ubyte = get_struct(endian + "B")
+		self._int16 = get_struct(endian + "h")
+		self._uint16 = get_struct(endian + "H")
+		self._int32 = get_struct(endian + "i")
+		self._uint32 = get_struct(endian + "I")
+		self._int64 = get_struct(endian + "q")
+		self._uint64 = get_struct(endian + "Q")
+		self._float = get_struct(endian + "f")
+		self._double = get_struct(endian + "d")
+
+	@property
+	def in_memory(self) -> bool:
+		return self._data is not None
+
 	def align(self) -> None:
 		old = self.tell()
 		new = (old + 3) & -4
 		if new > old:
 			self.seek(new - old, SEEK_CUR)
 
-	def read(self, *args) -> bytes:
-		return self.buf.read(*args)
+	def read(self, size: int = -1) -> bytes:
+		if self._data is None:
+			return self.buf.read(size)
+
+		start = self._offset
+		end = len(self._data) if size is None or size < 0 else min(start + size, len(self._data))
+		self._offset = end
 
-	def seek(self, *args) -> int:
-		return self.buf.seek(*args)
+		return self._data[start:end].tobytes()
+
+	def seek(self, offset: int, whence: int = SEEK_SET) -> int:
+		if self._data is None:
+			return self.buf.seek(offset, whence)
+
+		if whence == SEEK_CUR:
+			offset += self._offset
+		elif whence == SEEK_END:
+			offset += len(self._data)
+
+		self._offset = max(0, offset)
+		return self._offset
 
 	def tell(self) -> int:
-		return self.buf.tell()
+		if self._data is None:
+			return self.buf.tell()
+
+		return self._offset
+
+	def is_native(self) -> bool:
+		return self.endian in NATIVE_ENDIANS
+
+	def read_view(self, size: int) -> memoryview:
+		"""
+		Returns a zero-copy view of the next size bytes. Requires the
+		underlying buffer to support the buffer protocol (bytes, mmap)
+		"""
+
+		if self._data is None:
+			offset = self.tell()
+			view = memoryview(self.buf)[offset:offset + size]
+			self.seek(size, SEEK_CUR)
+			return view
+
+		start = self._offset
+		self._offset += size
+
+		return self._data[start:self._offset]
+
+	def read_into(self, target) -> int:
+		"""
+		Fills the writable target buffer with the next raw bytes, returning
+		the number of bytes read. No byte order conversion is applied
+		"""
+
+		view = memoryview(target).cast("B")
+		if self._data is None:
+			if hasattr(self.buf, "readinto"):
+				return self.buf.readinto(view)
+
+			data = self.buf.read(len(view))
+			view[:len(data)] = data
+			return len(data)
+
+		data = self._data[self._offset:self._offset + len(view)]
+		view[:len(data)] = data
+		self._offset += len(data)
+
+		return len(data)
+
+	def read_array(self, typecode: str, count: int) -> array:
+		"""
+		Decodes count values of the supplied array typecode in one call
+		"""
+
+		values = array(typecode)
+		if self._data is None:
+			values.frombytes(self.buf.read(count * values.itemsize))
+		else:
+			values.frombytes(self.read_view(count * values.itemsize))
+
+		if not self.is_native():
+			values.byteswap()
+
+		return values
+
+	def read_uint_array(self, count: int) -> array:
+		return self.read_array("I", count)
+
+	def read_int_array(self, count: int) -> array:
+		return self.read_array("i", count)
+
+	def read_float_array(self, count: int) -> array:
+		return self.read_array("f", count)
+
+	def _unpack(self, compiled: struct.Struct) -> tuple:
+		if self._data is None:
+			return compiled.unpack(self.buf.read(compiled.size))
+
+		offset = self._offset
+		self._offset = offset + compiled.size
+
+		return compiled.unpack_from(self._data, offset)
 
 	def read_string(self, size: int = None, encoding: str = "utf-8") -> str:
 		if size is None:
 			size = self.read_byte()
 
-		ret = struct.unpack(self.endian + "%is" % (size), self.read(size))[0]
+		ret = self._unpack(get_struct(self.endian + "%is" % (size)))[0]
 
 		return ret.decode(encoding)
 
 	def read_bool(self) -> bool:
-		return bool(struct.unpack(self.endian + "b", self.read(1))[0])
+		return bool(self._unpack(self._byte)[0])
 
 	def read_byte(self) -> int:
-		return struct.unpack(self.endian + "b", self.read(1))[0]
+		return self._unpack(self._byte)[0]
 
 	def read_ubyte(self) -> int:
-		return struct.unpack(self.endian + "B", self.read(1))[0]
+		return self._unpack(self._ubyte)[0]
 
 	def read_int16(self) -> int:
-		return struct.unpack(self.endian + "h", self.read(2))[0]
+		return self._unpack(self._int16)[0]
 
 	def read_uint16(self) -> int:
-		return struct.unpack(self.endian + "H", self.read(2))[0]
+		return self._unpack(self._uint16)[0]
 
 	def read_int32(self) -> int:
-		return struct.unpack(self.endian + "i", self.read(4))[0]
+		return self._unpack(self._int32)[0]
 
 	def read_uint32(self) -> int:
-		return struct.unpack(self.endian + "I", self.read(4))[0]
+		return self._unpack(self._uint32)[0]
 
 	def read_int64(self) -> int:
-		return struct.unpack(self.endian + "q", self.read(8))[0]
+		return self._unpack(self._int64)[0]
 
 	def read_uint64(self) -> int:
-		return struct.unpack(self.endian + "Q", self.read(8))[0]
+		return self._unpack(self._uint64)[0]
 
 	def read_float(self) -> float:
-		return struct.unpack(self.endian + "f", self.read(4))[0]
+		return self._unpack(self._float)[0]
 
 	def read_double(self) -> float:
-		return struct.unpack(self.endian + "d", self.read(8))[0]
+		return self._unpack(self._double)[0]
 
 	def read_struct(self, format: str) -> tuple:
 		if not format.startswith(ENDIAN_PREFIXES):
 			format = self.endian + format
-		size = struct.calcsize(format)
-		return struct.unpack(format, self.read(size))
+		return self._unpack(get_struct(format))
 
 	def read_int(self) -> int:
 		return self.read_int32()
 
 	def read_uint(self) -> int:
-		return self.read_uint32()
\ No newline at end of file
+		return self.read_uint32()
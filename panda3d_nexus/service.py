@@ -0,0 +1,123 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from direct.directnotify.DirectNotifyGlobal import directNotify
+
+from multiprocessing import shared_memory
+import os
+
+# Segments published by this process, whose cleanup the process owns
+_published = set()
+
+class MapService(object):
+    """
+    Publishes a map into a shared memory segment using the map cache
+    layout. Zone processes attach with MapFile.read_shared, sharing one
+    copy of the terrain and skipping the parse. The segment lives until
+    the service is closed
+    """
+
+    notify = directNotify.newCategory('map-service')
+
+    def __init__(self, map_file, name: str = None):
+        chunks = map_file.get_cache_chunks()
+        size = sum(len(chunk) for chunk in chunks)
+
+        self._memory = create_segment(size, name)
+        self._name = self._memory.name
+        self._size = size
+
+        view = self._memory.buf
+        offset = 0
+        for chunk in chunks:
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+        self.notify.info('Published map %s as %s (%s bytes)' % (map_file.asset, self._memory.name, size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        """
+        Unmaps and removes the segment. Attached processes keep their
+        mapping until they close it
+        """
+
+        if self._memory is None:
+            return
+
+        self._memory.close()
+        unlink_segment(self._memory)
+        self._memory = None
+
+def create_segment(size: int, name: str = None) -> shared_memory.SharedMemory:
+    """
+    Creates a zero filled segment owned by this process
+    """
+
+    memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _published.add(memory.name)
+
+    return memory
+
+def unlink_segment(memory: shared_memory.SharedMemory) -> None:
+    """
+    Removes a segment created by create_segment. Processes that still map
+    it, including this one, keep their mapping until they close it
+    """
+
+    _published.discard(memory.name)
+    memory.unlink()
+
+def attach_segment(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing segment without taking ownership of it
+    """
+
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # Before Python 3.13 attaching registers the segment with this process's
+    # resource tracker, which would unlink it when the process exits
+    memory = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix' and memory.name not in _published:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(memory._name, 'shared_memory')
+
+    return memory
@@ -0,0 +1,162 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from . import map as nfmap, grid, constants
+
+from array import array
+import math
+import random
+import struct
+import sys
+
+class SyntheticMap(object):
+    """
+    Writes valid NFMap files with generated terrain for testing and
+    benchmarking. Heights are sampled from a smooth global function so
+    neighbouring cells share their edge vertices
+    """
+
+    def __init__(self, grid_count: int = 4, cell_count: int = 256, seed: int = 0, asset: str = 'Synthetic',
+                 liquid_level: float = None, auras: bool = False):
+        if not 0 < cell_count <= grid.MapFileGrid.CELL_SLOTS:
+            raise ValueError('Invalid cell count: %s' % cell_count)
+
+        self._grid_count = grid_count
+        self._cell_count = cell_count
+        self._seed = seed
+        self._asset = asset
+        self._liquid_level = liquid_level
+        self._auras = auras
+
+        rnd = random.Random(seed)
+        self._waves = [(rnd.uniform(0.002, 0.02), rnd.uniform(0.002, 0.02),
+            rnd.uniform(0, math.pi * 2), rnd.uniform(10, 80)) for i in range(4)]
+        self._area_ids = [rnd.randrange(1, 5000) for i in range(16)]
+
+    @property
+    def grid_count(self) -> int:
+        return self._grid_count
+
+    @property
+    def cell_count(self) -> int:
+        return self._cell_count
+
+    def get_grid_coords(self) -> list:
+        """
+        Returns the grid coordinates written, filling a square around the
+        world origin
+        """
+
+        side = int(math.ceil(math.sqrt(self._grid_count)))
+        start = constants.world_grid_origin - side // 2
+
+        return [(start + i % side, start + i // side) for i in range(self._grid_count)]
+
+    def get_height(self, vertex_x: int, vertex_y: int) -> float:
+        """
+        Returns the generated height at the global vertex coordinate
+        """
+
+        height = 0.0
+        for freq_x, freq_y, phase, amplitude in self._waves:
+            height += amplitude * math.sin(vertex_x * freq_x + phase) * math.cos(vertex_y * freq_y - phase)
+
+        return height
+
+    def write(self, filepath: str) -> None:
+        """
+        Writes the map file to disk
+        """
+
+        with open(filepath, 'wb') as f:
+            for chunk in self.iter_chunks():
+                f.write(chunk)
+
+    def iter_chunks(self):
+        """
+        Yields the map file binary data in order, one grid at a time
+        """
+
+        asset = self._asset.encode('utf-8')
+        yield struct.pack('<3Ib', nfmap.MapFile.MAGIC, nfmap.MapFile.VERSION, nfmap.MapFile.BUILD, len(asset)) + asset
+
+        grid_coords = self.get_grid_coords()
+        yield struct.pack('<I', len(grid_coords))
+        for x, y in grid_coords:
+            yield self.__get_grid_data(x, y)
+
+    def __get_grid_data(self, x: int, y: int) -> bytes:
+        """
+        Returns the binary data of a single grid. Every cell carries the
+        area and height layers, plus an aura layer when enabled and a flat
+        liquid layer when its terrain dips below the liquid level
+        """
+
+        cells = constants.grid_cell_count
+        stride = constants.cell_vertex_count - 1
+
+        chunks = [struct.pack('<3I', x, y, self._cell_count)]
+        for slot in range(self._cell_count):
+            cell_x = slot % cells
+            cell_y = slot // cells
+            base_x = (x * cells + cell_x) * stride
+            base_y = (y * cells + cell_y) * stride
+
+            area_id = self._area_ids[((x * cells + cell_x) // 4 * 7 + (y * cells + cell_y) // 4) & 15]
+            heightmap = array('f', [self.get_height(base_x + i, base_y + j)
+                for i in range(constants.cell_vertex_count) for j in range(constants.cell_vertex_count)])
+
+            flags = grid.MapFileCell.AREA_FLAG | grid.MapFileCell.HEIGHT_FLAG
+            if self._auras:
+                flags |= grid.MapFileCell.AURA_FLAG
+
+            liquid = self._liquid_level is not None and min(heightmap) < self._liquid_level
+            if liquid:
+                flags |= grid.MapFileCell.LIQUID_FLAG
+
+            if sys.byteorder != 'little':
+                heightmap.byteswap()
+
+            chunks.append(struct.pack('<3I4I', cell_x, cell_y, flags, area_id, 0, 0, 0))
+            chunks.append(heightmap.tobytes())
+            if self._auras:
+                chunks.append(struct.pack('<4I', area_id + 1, 0, 0, 0))
+
+            if liquid:
+                chunks.append(struct.pack('<%sf' % grid.MapFileCell.HEIGHTMAP_LENGTH,
+                    *[self._liquid_level] * grid.MapFileCell.HEIGHTMAP_LENGTH))
+
+        return b''.join(chunks)
+
+def write_map(filepath: str, grid_count: int = 4, cell_count: int = 256, seed: int = 0,
+              liquid_level: float = None, auras: bool = False) -> SyntheticMap:
+    """
+    Writes a synthetic map file to disk and returns its generator
+    """
+
+    synthetic = SyntheticMap(grid_count, cell_count, seed, liquid_level=liquid_level, auras=auras)
+    synthetic.write(filepath)
+
+    return synthetic
@@ -0,0 +1,57 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from panda3d_nexus import synthetic
+
+class MapTestCase(unittest.TestCase):
+    """
+    Writes a synthetic map into a temporary directory for each test
+    """
+
+    GRID_COUNT = 4
+    CELL_COUNT = 16
+    LIQUID_LEVEL = None
+    AURAS = False
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filepath = self.get_path('test.nfmap')
+        self.synthetic = synthetic.write_map(self.filepath, self.GRID_COUNT, self.CELL_COUNT,
+            liquid_level=self.LIQUID_LEVEL, auras=self.AURAS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_path(self, filename: str) -> str:
+        """
+        Returns the path of a file within the test's temporary directory
+        """
+
+        return os.path.join(self.directory, filename)
@@ -0,0 +1,93 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import asyncio
+import threading
+import unittest
+
+from panda3d_nexus import map as nfmap
+
+from . import MapTestCase
+
+class AsyncLoadTest(MapTestCase):
+    """
+    Async loads report progress, surface worker errors and stop their
+    worker thread when cancelled
+    """
+
+    GRID_COUNT = 16
+    CELL_COUNT = 64
+
+    def get_loaders(self) -> list:
+        return [thread for thread in threading.enumerate() if thread.name == 'map-loader']
+
+    def test_progress(self):
+        updates = []
+        map_file = asyncio.run(nfmap.MapFile.read_async(self.filepath, lambda *args: updates.append(args)))
+
+        self.assertEqual(updates[0], (0, self.GRID_COUNT))
+        self.assertEqual(updates[-1], (self.GRID_COUNT, self.GRID_COUNT))
+        self.assertEqual([loaded for loaded, total in updates], list(range(self.GRID_COUNT + 1)))
+        self.assertEqual(map_file.get_load_progress(), (self.GRID_COUNT, self.GRID_COUNT))
+        self.assertEqual(list(map_file.grids), list(nfmap.MapFile.read(self.filepath).grids))
+
+    def test_error(self):
+        filepath = self.get_path('truncated.nfmap')
+        with open(self.filepath, 'rb') as source, open(filepath, 'wb') as target:
+            target.write(source.read(4096))
+
+        with self.assertRaises(Exception):
+            asyncio.run(nfmap.MapFile.read_async(filepath))
+
+    def test_cancel(self):
+        errors = []
+        excepthook = threading.excepthook
+        threading.excepthook = errors.append
+
+        async def load():
+            started = asyncio.Event()
+
+            def progress(loaded, total):
+                if loaded:
+                    started.set()
+
+            task = asyncio.ensure_future(nfmap.MapFile.read_async(self.filepath, progress))
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        try:
+            asyncio.run(load())
+            for thread in self.get_loaders():
+                thread.join(5)
+
+            self.assertEqual(self.get_loaders(), [])
+            self.assertEqual(errors, [])
+        finally:
+            threading.excepthook = excepthook
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import struct
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import mapcache
+
+from . import MapTestCase
+
+class CacheTest(MapTestCase):
+    """
+    Map caches reload the same grids and reject short, corrupt or stale
+    data with a ValueError
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+        self.cachepath = self.get_path('test.nfcache')
+        self.map_file.write_cache(self.cachepath)
+        with open(self.cachepath, 'rb') as f:
+            self.data = f.read()
+
+    def parse(self, data: bytes) -> nfmap.MapFile:
+        map_file = nfmap.MapFile()
+        map_file.parse_cache(data)
+        return map_file
+
+    def test_round_trip(self):
+        cached = nfmap.MapFile.read_cache(self.cachepath)
+        try:
+            self.assertEqual(cached.asset, self.map_file.asset)
+            self.assertEqual(cached.get_grid_coords(), self.map_file.get_grid_coords())
+            for x, y in self.map_file.get_grid_coords():
+                vector = core.Vec2(x, y)
+                self.assertEqual(cached.get_grid_exact(vector).get_tiles()[:3],
+                    self.map_file.get_grid_exact(vector).get_tiles()[:3])
+        finally:
+            cached.close()
+
+    def test_chunks(self):
+        self.assertEqual(b''.join(self.map_file.get_cache_chunks()), self.data)
+
+    def test_truncated(self):
+        for size in (0, mapcache.HEADER.size - 1, len(self.data) - 1):
+            with self.assertRaises(ValueError):
+                self.parse(self.data[:size])
+
+    def test_checksum(self):
+        data = bytearray(self.data)
+        data[-1] ^= 0xFF
+        with self.assertRaises(ValueError):
+            self.parse(bytes(data))
+
+        nfmap.MapFile().parse_cache(bytes(data), verify=False)
+
+    def test_stale(self):
+        data = bytearray(self.data)
+        struct.pack_into('<I', data, 12, nfmap.MapFile.BUILD + 1)
+        with self.assertRaises(ValueError):
+            self.parse(bytes(data))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from array import array
+import json
+import os
+import unittest
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import export, heightfield
+
+from . import MapTestCase
+
+class ExportTest(MapTestCase):
+    """
+    Exported tiles match the map's heightfields and share its real height
+    range
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+        self.output = self.get_path('export')
+
+    def read_tile(self, filename: str, typecode: str) -> array:
+        tile = array(typecode)
+        with open(os.path.join(self.output, filename), 'rb') as f:
+            tile.frombytes(f.read())
+
+        return tile
+
+    def test_f32(self):
+        manifest = export.export_map(self.filepath, self.output, 'f32', workers=2)
+        self.assertEqual([(entry['x'], entry['y']) for entry in manifest['grids']], self.map_file.get_grid_coords())
+        for entry in manifest['grids']:
+            file_grid = self.map_file.grids[entry['x'] << 16 | entry['y']]
+            self.assertEqual(self.read_tile(entry['file'], 'f'), heightfield.Heightfield.from_grid(file_grid).data)
+
+    def test_r16(self):
+        manifest = export.export_map(self.filepath, self.output, 'r16', workers=2)
+        heights = [h for file_grid in self.map_file.grids.values() for cell in file_grid.cells.values()
+            for h in cell.heights]
+        low, high = min(heights), max(heights)
+        self.assertEqual(tuple(manifest['range']), (low, high))
+
+        with open(os.path.join(self.output, 'manifest.json')) as f:
+            self.assertEqual(json.load(f), manifest)
+
+        step = (high - low) / export.SAMPLE_MAX
+        for entry in manifest['grids']:
+            file_grid = self.map_file.grids[entry['x'] << 16 | entry['y']]
+            field = heightfield.Heightfield.from_grid(file_grid)
+            for sample, height in zip(self.read_tile(entry['file'], 'H'), field.data):
+                if height == field.nodata:
+                    self.assertEqual(sample, 0)
+                else:
+                    self.assertAlmostEqual(low + sample * step, height, delta=step)
+
+if __name__ == '__main__':
+    unittest.main()
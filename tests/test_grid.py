@@ -0,0 +1,92 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import unittest
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import grid
+
+from . import MapTestCase
+
+class CellLayerViewTest(MapTestCase):
+    """
+    The heightmap and world_area_ids views keep the dict style access the
+    cells offered before their layers moved into flat arrays
+    """
+
+    GRID_COUNT = 1
+    CELL_COUNT = 4
+
+    def get_cell(self, map_file) -> grid.MapFileCell:
+        file_grid = next(iter(map_file.grids.values()))
+        return next(iter(file_grid.cells.values()))
+
+    def test_heightmap(self):
+        cell = self.get_cell(nfmap.MapFile.read(self.filepath))
+        self.assertEqual(len(cell.heightmap), grid.MapFileCell.HEIGHTMAP_LENGTH)
+        self.assertEqual(cell.heightmap[(3, 4)], cell.heights[3 * 17 + 4])
+        self.assertEqual(list(cell.heightmap.values()), list(cell.heights))
+        self.assertEqual(next(iter(cell.heightmap)), (0, 0))
+        with self.assertRaises(KeyError):
+            cell.heightmap[(17, 0)]
+
+    def test_world_area_ids(self):
+        cell = self.get_cell(nfmap.MapFile.read(self.filepath))
+        self.assertEqual(list(cell.world_area_ids.values()), list(cell.area_ids))
+        self.assertEqual(dict(cell.world_area_ids), dict(enumerate(cell.area_ids)))
+
+    def test_empty_cell(self):
+        cell = grid.MapFileCell()
+        self.assertEqual(dict(cell.heightmap), {})
+        self.assertEqual(dict(cell.world_area_ids), {})
+
+    def test_zero_copy(self):
+        map_file = nfmap.MapFile.open_mmap(self.filepath)
+        try:
+            cell = self.get_cell(map_file)
+            self.assertEqual(cell.heightmap, self.get_cell(nfmap.MapFile.read(self.filepath)).heightmap)
+            del cell
+        finally:
+            map_file.close()
+
+    def test_zero_copy_on_demand(self):
+        eager = next(iter(nfmap.MapFile.read(self.filepath).grids.values()))
+        map_file = nfmap.MapFile.open_mmap(self.filepath, layers=grid.MapFileCell.HEIGHT_FLAG)
+        try:
+            file_grid = map_file.grids[eager.x << 16 | eager.y]
+            self.assertEqual(file_grid.get_cell_count(), eager.get_cell_count())
+
+            slot = next(slot for slot in range(grid.MapFileGrid.CELL_SLOTS) if eager.get_cell_slot(slot))
+            cell = file_grid.get_cell_slot(slot)
+            self.assertIsInstance(cell.heights, memoryview)
+            self.assertEqual(list(cell.heights), list(eager.get_cell_slot(slot).heights))
+            self.assertEqual(cell.flags, grid.MapFileCell.HEIGHT_FLAG)
+            self.assertEqual(set(file_grid.cells), set(eager.cells))
+            del cell, file_grid
+        finally:
+            map_file.close()
+
+if __name__ == '__main__':
+    unittest.main()
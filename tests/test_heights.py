@@ -0,0 +1,84 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from array import array
+import random
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import constants
+
+from . import MapTestCase
+
+class TerrainHeightsTest(MapTestCase):
+    """
+    The batched height lookup must match the single point lookup, with
+    and without numpy
+    """
+
+    CELL_COUNT = 64
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+
+        # Sample around each grid, including points past its populated cells
+        rnd = random.Random(0)
+        size = constants.grid_size
+        origin = constants.world_grid_origin * size
+        self.xs = array('f')
+        self.ys = array('f')
+        for x, y in self.map_file.get_grid_coords():
+            for i in range(500):
+                self.xs.append(x * size - origin + rnd.uniform(0, size))
+                self.ys.append(y * size - origin + rnd.uniform(0, size))
+
+        self.xs.extend([1e9, -1e9])
+        self.ys.extend([0, 0])
+
+    def test_single_lookup(self):
+        heights = self.map_file.get_terrain_heights(self.xs, self.ys)
+        self.assertEqual(len(heights), len(self.xs))
+        self.assertEqual(list(heights[-2:]), [0.0, 0.0])
+        for i in range(len(self.xs) - 2):
+            expected = self.map_file.get_terrain_height(core.Vec2(self.xs[i], self.ys[i]))
+            self.assertAlmostEqual(heights[i], expected, places=3)
+
+    @unittest.skipIf(nfmap.numpy is None, 'numpy is not installed')
+    def test_fallback(self):
+        heights = self.map_file.get_terrain_heights(self.xs, self.ys)
+        numpy = nfmap.numpy
+        nfmap.numpy = None
+        try:
+            fallback = self.map_file.get_terrain_heights(self.xs, self.ys)
+        finally:
+            nfmap.numpy = numpy
+
+        self.assertEqual(heights.tobytes(), fallback.tobytes())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import gc
+import unittest
+import weakref
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+
+from . import MapTestCase
+
+class InstrumentationTest(MapTestCase):
+    """
+    Lookups are counted while the stats are enabled without keeping the
+    map alive, and load callbacks are scoped to their map
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+
+    def test_lookup_counts(self):
+        stats = self.map_file.stats
+        for i in range(3):
+            self.map_file.get_terrain_height(core.Vec2(0, 0))
+
+        self.assertEqual(stats.get_lookup_count('terrain_height'), 3)
+
+        stats.enabled = False
+        self.map_file.get_terrain_height(core.Vec2(0, 0))
+        self.assertEqual(stats.get_lookup_count('terrain_height'), 3)
+
+        stats.enabled = True
+        self.map_file.get_terrain_height(core.Vec2(0, 0))
+        self.assertEqual(stats.as_dict()['lookups']['terrain_height']['count'], 4)
+
+        stats.reset()
+        self.assertEqual(stats.get_lookup_count('terrain_height'), 0)
+
+    def test_temporary_map(self):
+        # The lookup must keep a map nothing else references alive
+        height = nfmap.MapFile.read(self.filepath).get_terrain_height(core.Vec2(0, 0))
+        self.assertEqual(height, self.map_file.get_terrain_height(core.Vec2(0, 0)))
+
+    def test_keyword_arguments(self):
+        self.assertEqual(self.map_file.get_terrain_height(vector=core.Vec2(0, 0)),
+            self.map_file.get_terrain_height(core.Vec2(0, 0)))
+        self.assertEqual(self.map_file.stats.get_lookup_count('terrain_height'), 2)
+
+    def test_class(self):
+        self.assertIsInstance(self.map_file, nfmap.MapFile)
+        self.assertIsNot(type(self.map_file), nfmap.MapFile)
+        self.map_file.stats.enabled = False
+        self.assertIs(type(self.map_file), nfmap.MapFile)
+
+    def test_map_freed_by_refcount(self):
+        self.assertTrue(self.map_file.stats.enabled)
+        self.map_file.get_terrain_height(core.Vec2(0, 0))
+        reference = weakref.ref(self.map_file)
+        gc.disable()
+        try:
+            del self.map_file
+            self.assertIsNone(reference())
+        finally:
+            gc.enable()
+
+    def test_load_callback(self):
+        cachepath = self.get_path('test.nfcache')
+        self.map_file.write_cache(cachepath)
+        with open(cachepath, 'rb') as cache:
+            data = cache.read()
+
+        loaded = []
+        map_file, other = nfmap.MapFile(), nfmap.MapFile()
+        map_file.load_callback = loaded.append
+        map_file.parse_cache(data)
+        other.parse_cache(data)
+        self.assertEqual(loaded, [map_file])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import math
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import grid, constants
+
+from . import MapTestCase
+
+class LayerTest(MapTestCase):
+    """
+    Aura and liquid layers parse alongside the area and height layers, and
+    layers missing from the layers mask are skipped in every read mode
+    """
+
+    CELL_COUNT = 64
+    LIQUID_LEVEL = 0.0
+    AURAS = True
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+
+    def get_center(self, file_grid: grid.MapFileGrid, cell: grid.MapFileCell) -> core.Vec2:
+        """
+        Returns the world position of the center of the cell
+        """
+
+        origin = constants.world_grid_origin * constants.grid_size
+        cells = constants.grid_cell_count
+        return core.Vec2(
+            (file_grid.x * cells + cell.x + 0.5) * constants.grid_cell_size - origin,
+            (file_grid.y * cells + cell.y + 0.5) * constants.grid_cell_size - origin)
+
+    def iter_cells(self, map_file):
+        for file_grid in map_file.grids.values():
+            for cell in file_grid.cells.values():
+                yield file_grid, cell
+
+    def test_aura_ids(self):
+        for file_grid, cell in self.iter_cells(self.map_file):
+            self.assertTrue(cell.flags & grid.MapFileCell.AURA_FLAG)
+            self.assertEqual(list(cell.get_aura_ids()), [cell.area_ids[0] + 1, 0, 0, 0])
+
+    def test_liquid(self):
+        liquid = 0
+        for file_grid, cell in self.iter_cells(self.map_file):
+            center = self.get_center(file_grid, cell)
+            height = self.map_file.get_liquid_height(center)
+            batch = self.map_file.get_liquid_heights([center[0]], [center[1]])[0]
+            if min(cell.heights) < self.LIQUID_LEVEL:
+                liquid += 1
+                self.assertEqual(list(cell.liquid_heightmap), [self.LIQUID_LEVEL] * grid.MapFileCell.HEIGHTMAP_LENGTH)
+                self.assertEqual(height, self.LIQUID_LEVEL)
+                self.assertEqual(batch, self.LIQUID_LEVEL)
+            else:
+                self.assertFalse(cell.flags & grid.MapFileCell.LIQUID_FLAG)
+                self.assertIsNone(height)
+                self.assertTrue(math.isnan(batch))
+
+        self.assertGreater(liquid, 0)
+
+    def check_layers(self, map_file, layers: int):
+        """
+        Asserts every cell of map_file holds exactly the requested layers
+        of the fully read map
+        """
+
+        coords = self.map_file.get_grid_coords()
+        self.assertEqual(map_file.get_grid_coords(), coords)
+        for x, y in coords:
+            file_grid = map_file.get_grid_exact(core.Vec2(x, y))
+            for cell_coords, full in self.map_file.get_grid_exact(core.Vec2(x, y)).cells.items():
+                cell = file_grid.cells[cell_coords]
+                self.assertEqual(cell.flags, full.flags & layers)
+                self.assertEqual(list(cell.heights), list(full.heights) if layers & grid.MapFileCell.HEIGHT_FLAG else [])
+                self.assertEqual(list(cell.area_ids), list(full.area_ids) if layers & grid.MapFileCell.AREA_FLAG else [0] * 4)
+                self.assertEqual(list(cell.liquid_heightmap),
+                    list(full.liquid_heightmap) if layers & grid.MapFileCell.LIQUID_FLAG else [])
+                self.assertEqual(list(cell.get_aura_ids()),
+                    list(full.get_aura_ids()) if layers & grid.MapFileCell.AURA_FLAG else [])
+
+    def test_layer_skipping(self):
+        # Skipping the height layer must land on the aura and liquid layers after it
+        for layers in (grid.MapFileCell.HEIGHT_FLAG, grid.MapFileCell.AREA_FLAG | grid.MapFileCell.LIQUID_FLAG,
+                       grid.MapFileCell.AURA_FLAG):
+            self.check_layers(nfmap.MapFile.read(self.filepath, layers=layers), layers)
+
+            lazy = nfmap.MapFile.read(self.filepath, lazy=True, layers=layers)
+            self.check_layers(lazy, layers)
+            lazy.close()
+
+            mapped = nfmap.MapFile.open_mmap(self.filepath, layers=layers)
+            self.check_layers(mapped, layers)
+            mapped.close()
+
+if __name__ == '__main__':
+    unittest.main()
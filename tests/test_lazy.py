@@ -0,0 +1,76 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+
+from . import MapTestCase
+
+class LazyTest(MapTestCase):
+    """
+    Lazy maps parse the same grids as eager ones on demand, within their
+    LRU cache size
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.eager = nfmap.MapFile.read(self.filepath)
+        self.map_file = nfmap.MapFile.read(self.filepath, lazy=True, cache_size=2)
+
+    def tearDown(self):
+        self.map_file.close()
+        super().tearDown()
+
+    def test_grids(self):
+        self.assertTrue(self.map_file.lazy)
+        self.assertEqual(self.map_file.grids, {})
+        self.assertEqual(self.map_file.get_grid_coords(), self.eager.get_grid_coords())
+        for x, y in self.eager.get_grid_coords():
+            file_grid = self.map_file.get_grid_exact(core.Vec2(x, y))
+            self.assertEqual(file_grid.get_tiles(), self.eager.get_grid_exact(core.Vec2(x, y)).get_tiles())
+
+        self.assertEqual(len(self.map_file.grids), 2)
+
+    def test_cache_stats(self):
+        x, y = self.eager.get_grid_coords()[0]
+        for coords in [(x, y)] + self.eager.get_grid_coords():
+            self.map_file.get_grid_exact(core.Vec2(*coords))
+
+        stats = self.map_file.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 4, 2))
+
+    def test_close(self):
+        x, y = self.eager.get_grid_coords()[0]
+        self.map_file.get_grid_exact(core.Vec2(x, y))
+        self.map_file.close()
+        self.assertFalse(self.map_file.lazy)
+        self.assertIsNone(self.map_file.get_grid_exact(core.Vec2(x, y)))
+        self.assertEqual(self.map_file.get_grid_coords(), [])
+
+if __name__ == '__main__':
+    unittest.main()
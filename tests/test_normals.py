@@ -0,0 +1,114 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import math
+import random
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import heightfield, constants
+
+from . import MapTestCase
+
+class NormalTest(MapTestCase):
+    """
+    Terrain normals are built across cell and grid edges from the shared
+    heightfield, so they stay continuous where cells meet
+    """
+
+    CELL_COUNT = 256
+    EPSILON = 0.00001
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+        self.origin = constants.world_grid_origin * constants.grid_size
+        self.random = random.Random(0)
+
+    def get_angle(self, a, b) -> float:
+        # atan2 stays accurate for nearly parallel normals, unlike acos
+        cross = (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+        return math.degrees(math.atan2(math.sqrt(sum(c * c for c in cross)), sum(x * y for x, y in zip(a, b))))
+
+    def test_continuous_across_edges(self):
+        (min_x, min_y), (max_x, max_y) = min(self.map_file.get_grid_coords()), max(self.map_file.get_grid_coords())
+        for i in range(200):
+            # Every cell edge along x, including the edge between the grids
+            edge = self.random.randrange(1, (max_x - min_x + 1) * constants.grid_cell_count)
+            x = (min_x * constants.grid_cell_count + edge) * constants.grid_cell_size - self.origin
+            y = self.random.uniform(min_y, max_y + 1) * constants.grid_size - self.origin
+
+            before = self.map_file.get_terrain_normal(core.Vec2(x - self.EPSILON, y))
+            after = self.map_file.get_terrain_normal(core.Vec2(x + self.EPSILON, y))
+            self.assertLess(self.get_angle(before, after), 0.01)
+
+    def test_matches_heightfield(self):
+        field = heightfield.Heightfield.from_map(self.map_file)
+        for i in range(200):
+            # Half of the vertices lie on a cell edge
+            vertex_x = self.random.randrange(1, field.width - 1)
+            vertex_y = self.random.randrange(1, field.height - 1)
+            if self.random.random() < 0.5:
+                edge = constants.cell_vertex_count - 1
+                vertex_x = self.random.randrange(1, (field.width - 1) // edge) * edge
+
+            normal = self.map_file.get_terrain_normal(core.Vec2(
+                field.origin[0] + vertex_x * field.spacing,
+                field.origin[1] + vertex_y * field.spacing))
+
+            slope_x = (field.get_vertex(vertex_x - 1, vertex_y) - field.get_vertex(vertex_x + 1, vertex_y)) / (2 * field.spacing)
+            slope_y = (field.get_vertex(vertex_x, vertex_y - 1) - field.get_vertex(vertex_x, vertex_y + 1)) / (2 * field.spacing)
+            length = math.sqrt(slope_x * slope_x + slope_y * slope_y + 1.0)
+            for value, expected in zip(normal, (slope_x / length, slope_y / length, 1.0 / length)):
+                self.assertAlmostEqual(value, expected, places=5)
+
+    def test_batch(self):
+        xs = [self.random.uniform(-600, 600) for i in range(300)]
+        ys = [self.random.uniform(-600, 600) for i in range(300)]
+        normals = nfmap.MapFile.read(self.filepath).get_terrain_normals(xs, ys)
+        slopes = nfmap.MapFile.read(self.filepath).get_slopes(xs, ys)
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            normal = self.map_file.get_terrain_normal(core.Vec2(x, y))
+            for k in range(3):
+                self.assertAlmostEqual(normals[i * 3 + k], normal[k], places=5)
+
+            self.assertAlmostEqual(slopes[i], self.map_file.get_slope(core.Vec2(x, y)), places=3)
+
+    def test_grid_normals(self):
+        x, y = self.map_file.get_grid_coords()[0]
+        file_grid = nfmap.MapFile.read(self.filepath).get_grid_exact(core.Vec2(x, y))
+        for i in range(100):
+            # Stay clear of the grid's border, where the map sees the next grid
+            vector = core.Vec2(
+                x * constants.grid_size - self.origin + self.random.uniform(32, 480),
+                y * constants.grid_size - self.origin + self.random.uniform(32, 480))
+
+            self.assertLess(self.get_angle(file_grid.get_terrain_normal(vector),
+                self.map_file.get_terrain_normal(vector)), 0.001)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import gc
+import random
+import unittest
+import weakref
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+
+from . import MapTestCase
+
+class RaycastTest(MapTestCase):
+    """
+    Raycasts must hit the same interpolated surface get_terrain_height
+    samples
+    """
+
+    CELL_COUNT = 256
+    STEPS = 2000
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+
+        rnd = random.Random(0)
+        self.segments = []
+        for i in range(60):
+            start = (rnd.uniform(-500, 500), rnd.uniform(-500, 500), rnd.uniform(-100, 200))
+            end = (start[0] + rnd.uniform(-200, 200), start[1] + rnd.uniform(-200, 200), rnd.uniform(-100, 200))
+            self.segments.append((start, end))
+
+    def get_brute_fraction(self, start, end) -> float:
+        """
+        Returns the first sampled fraction of the segment at or below the terrain
+        """
+
+        for step in range(self.STEPS + 1):
+            fraction = step / self.STEPS
+            x, y, z = (start[i] + (end[i] - start[i]) * fraction for i in range(3))
+            if -512 <= x < 512 and -512 <= y < 512 and z <= self.map_file.get_terrain_height(core.Vec2(x, y)):
+                return fraction
+
+        return None
+
+    def test_vertical(self):
+        for x, y in ((10.5, 20.25), (-300.0, 123.0), (0.0, 0.0)):
+            hit = self.map_file.raycast(core.Point3(x, y, 500), core.Point3(x, y, -500))
+            self.assertAlmostEqual(hit[2], self.map_file.get_terrain_height(core.Vec2(x, y)), places=3)
+
+    def test_brute_force(self):
+        raycaster = self.map_file.get_raycaster()
+        hits = 0
+        for start, end in self.segments:
+            fraction = raycaster.get_hit_fraction(start, end)
+            expected = self.get_brute_fraction(start, end)
+            self.assertEqual(fraction is None, expected is None, (start, end))
+            if fraction is not None:
+                hits += 1
+                self.assertLessEqual(abs(fraction - expected), 2.0 / self.STEPS)
+
+        self.assertGreater(hits, 0)
+
+    def test_hits_lie_on_surface(self):
+        starts = [core.Point3(*start) for start, end in self.segments]
+        ends = [core.Point3(*end) for start, end in self.segments]
+        hits = self.map_file.raycast_batch(starts, ends)
+        self.assertEqual(self.map_file.has_line_of_sight_batch(starts, ends), [hit is None for hit in hits])
+        for start, hit in zip(starts, hits):
+            # Segments starting underground hit at their start
+            if hit is None or start[2] <= self.map_file.get_terrain_height(core.Vec2(start[0], start[1])):
+                continue
+
+            self.assertAlmostEqual(hit[2], self.map_file.get_terrain_height(core.Vec2(hit[0], hit[1])), places=2)
+
+    def test_map_freed_by_refcount(self):
+        self.map_file.raycast(core.Point3(0, 0, 500), core.Point3(0, 0, -500))
+        reference = weakref.ref(self.map_file)
+        gc.disable()
+        try:
+            del self.map_file
+            self.assertIsNone(reference())
+        finally:
+            gc.enable()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import service
+from panda3d_nexus import constants
+
+from . import MapTestCase
+
+class RegionTest(MapTestCase):
+    """
+    Maps read with bounds decode only the covered cells, and regions can
+    be added and removed afterwards, both eagerly and lazily
+    """
+
+    # Grid 64's first cells, and grid 63's last cells, along the x axis
+    EAST = (0, 0, 100, 64)
+    WEST = (-100, 0, -10, 64)
+
+    def setUp(self):
+        super().setUp()
+        self.full = nfmap.MapFile.read(self.filepath)
+
+    def get_cells(self, map_file) -> set:
+        cells = set()
+        for x, y in map_file.get_grid_coords():
+            file_grid = map_file.get_grid_exact(core.Vec2(x, y))
+            cells.update((x, y) + cell for cell in file_grid.cells)
+
+        return cells
+
+    def get_expected_cells(self, *regions) -> set:
+        cells = set()
+        vertex_size = constants.cell_vertex_size * (constants.cell_vertex_count - 1)
+        origin = constants.world_grid_origin * constants.grid_size
+        for x, y in self.full.get_grid_coords():
+            for cell_x, cell_y in self.full.grids[x << 16 | y].cells:
+                world_x = (x * constants.grid_cell_count + cell_x) * vertex_size - origin
+                world_y = (y * constants.grid_cell_count + cell_y) * vertex_size - origin
+                for min_x, min_y, max_x, max_y in regions:
+                    if world_x <= max_x and min_x < world_x + vertex_size and \
+                       world_y <= max_y and min_y < world_y + vertex_size:
+                        cells.add((x, y, cell_x, cell_y))
+
+        return cells
+
+    def check_round_trip(self, lazy: bool):
+        map_file = nfmap.MapFile.read(self.filepath, lazy=lazy, bounds=self.EAST)
+        self.assertEqual(self.get_cells(map_file), self.get_expected_cells(self.EAST))
+
+        map_file.add_region(self.WEST)
+        self.assertEqual(self.get_cells(map_file), self.get_expected_cells(self.EAST, self.WEST))
+
+        map_file.remove_region(self.EAST)
+        self.assertEqual(self.get_cells(map_file), self.get_expected_cells(self.WEST))
+
+        inside = core.Vec2(-50, 20)
+        self.assertEqual(map_file.get_terrain_height(inside), self.full.get_terrain_height(inside))
+        self.assertEqual(map_file.get_terrain_height(core.Vec2(50, 20)), 0)
+
+        with self.assertRaises(ValueError):
+            map_file.remove_region(self.EAST)
+
+        map_file.close()
+
+    def test_round_trip(self):
+        self.check_round_trip(False)
+
+    def test_lazy_round_trip(self):
+        self.check_round_trip(True)
+
+    def test_unbounded(self):
+        with self.assertRaises(ValueError):
+            self.full.add_region(self.EAST)
+
+class LazyRegionTest(MapTestCase):
+    """
+    Whole map helpers on a lazy map read with bounds must only visit the
+    grids covered by its regions
+    """
+
+    BOUNDS = (0, 0, 100, 64)
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath, lazy=True, bounds=self.BOUNDS)
+
+    def tearDown(self):
+        self.map_file.close()
+        super().tearDown()
+
+    def test_grid_coords(self):
+        coords = self.map_file.get_grid_coords()
+        self.assertEqual(len(coords), 1)
+        for x, y in coords:
+            self.assertIsNotNone(self.map_file.get_grid_exact(core.Vec2(x, y)))
+
+    def test_whole_map_helpers(self):
+        grid_vertices = constants.grid_size // constants.cell_vertex_size
+        heightfield = self.map_file.get_heightfield()
+        self.assertEqual((heightfield.width, heightfield.height), (grid_vertices + 1, grid_vertices + 1))
+
+        position = core.Vec2(10, 20)
+        self.assertIn(self.map_file.get_world_area_id(position), self.map_file.get_area_index().area_ids)
+
+        self.map_file.build_height_pyramids()
+        low, high = self.map_file.get_height_bounds(position)
+        self.assertLessEqual(low, self.map_file.get_terrain_height(position))
+        self.assertGreaterEqual(high, self.map_file.get_terrain_height(position))
+
+    def test_cache(self):
+        cachepath = self.get_path('regions.nfcache')
+        self.map_file.write_cache(cachepath)
+        cached = nfmap.MapFile.read_cache(cachepath)
+        self.assertEqual(cached.get_grid_coords(), self.map_file.get_grid_coords())
+        self.assertEqual(
+            cached.get_terrain_height(core.Vec2(10, 20)),
+            self.map_file.get_terrain_height(core.Vec2(10, 20)))
+
+    def test_service(self):
+        with service.MapService(self.map_file) as map_service:
+            shared = nfmap.MapFile.read_shared(map_service.name)
+            self.assertEqual(shared.get_grid_coords(), self.map_file.get_grid_coords())
+            shared.close()
+
+if __name__ == '__main__':
+    unittest.main()
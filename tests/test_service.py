@@ -0,0 +1,102 @@
+"""
+MIT License
+
+Copyright (c) 2019 Jordan Maxwell
+Written 10/02/2019
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from concurrent import futures
+import random
+import unittest
+
+from panda3d import core
+
+from panda3d_nexus import map as nfmap
+from panda3d_nexus import service, constants
+
+from . import MapTestCase
+
+def _read_shared(name: str, points: list) -> list:
+    """
+    Attaches to the published map and samples it. Runs inside a worker
+    process
+    """
+
+    map_file = nfmap.MapFile.read_shared(name)
+    try:
+        return [(map_file.get_terrain_height(core.Vec2(x, y)), map_file.get_world_area_id(core.Vec2(x, y)))
+            for x, y in points]
+    finally:
+        map_file.close()
+
+class ServiceTest(MapTestCase):
+    """
+    Maps published by MapService answer the same queries when attached
+    with read_shared, in this process or another one
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.map_file = nfmap.MapFile.read(self.filepath)
+        self.map_service = service.MapService(self.map_file)
+
+        # Points within the written cells, plus a few outside of the map
+        rng = random.Random(0)
+        origin = constants.world_grid_origin * constants.grid_size
+        self.points = [(-origin, -origin), (origin - 1, origin - 1)]
+        for i in range(200):
+            x, y = rng.choice(self.map_file.get_grid_coords())
+            slot = rng.randrange(self.CELL_COUNT)
+            self.points.append((
+                (x * constants.grid_cell_count + slot % constants.grid_cell_count + rng.random())
+                    * constants.grid_cell_size - origin,
+                (y * constants.grid_cell_count + slot // constants.grid_cell_count + rng.random())
+                    * constants.grid_cell_size - origin))
+
+        self.expected = [(self.map_file.get_terrain_height(core.Vec2(x, y)),
+            self.map_file.get_world_area_id(core.Vec2(x, y))) for x, y in self.points]
+
+    def tearDown(self):
+        self.map_service.close()
+        super().tearDown()
+
+    def test_read_shared(self):
+        self.assertEqual(_read_shared(self.map_service.name, self.points), self.expected)
+
+    def test_attach_from_process(self):
+        with futures.ProcessPoolExecutor(1) as executor:
+            self.assertEqual(executor.submit(_read_shared, self.map_service.name, self.points).result(),
+                self.expected)
+
+        # The worker exiting must not remove the segment
+        shared = nfmap.MapFile.read_shared(self.map_service.name)
+        self.assertEqual(shared.get_grid_coords(), self.map_file.get_grid_coords())
+        shared.close()
+
+    def test_close(self):
+        name = self.map_service.name
+        self.map_service.close()
+        self.assertEqual(self.map_service.name, name)
+        with self.assertRaises(FileNotFoundError):
+            nfmap.MapFile.read_shared(name)
+
+if __name__ == '__main__':
+    unittest.main()